@@ -1,186 +1,227 @@
+import json
+import os
+import time
 import streamlit as st
-import pandas as pd
-import requests
-from msal import ConfidentialClientApplication
+from hojas.registro import REGISTRO
+from hojas.utils import metricas_utils as metricas
 
 # Configurar diseño ancho para mejor visualización
 st.set_page_config(layout="wide")
 
-# Importar módulos específicos por hoja
-from hojas.expedicion_COMPLIANCE_DPO import run as run_compliance
-from hojas.expedicion_RRHH import run as run_rrhh
-from hojas.expedicion_DFINANCIERA import run as run_dfinanciera
-from hojas.expedicion_BIM import run as run_bim
-from hojas.expedicion_LOGISTICA import run as run_logistica
-from hojas.expedicion_EERR import run as run_eerr
-from hojas.expedicion_DF_SAP import run as run_df_sap
-from hojas.expedicion_CIBER import run as run_ciber
-from hojas.expedicion_PYTHON import run as run_python
-from hojas.expedicion_FULLSTACK import run as run_fullstack
-from hojas.expedicion_DPO_CIBER import run as run_dpo_ciber  # ✅ NUEVO
-
 # ==============================
 # 🔐 Configuración desde st.secrets
 # ==============================
-config = {
-    "client_id": st.secrets["CLIENT_ID"],
-    "tenant_id": st.secrets["TENANT_ID"],
-    "client_secret": st.secrets["CLIENT_SECRET"],
-    "domain": "grupomainjobs.sharepoint.com",
-    "site_name": "EIP",  # 👈 sitio nuevo
-    "file_name": "REGISTRO GENERAL DE TÍTULOS.xlsx",  # 👈 nombre del fichero
-}
+def leer_config():
+    """
+    Se lee al ejecutar main() y no al importar: el primer acceso a st.secrets
+    instala los watchers de los ficheros de secretos y tarda unos cientos de ms.
+    """
+    return {
+        "client_id": st.secrets["CLIENT_ID"],
+        "tenant_id": st.secrets["TENANT_ID"],
+        "client_secret": st.secrets["CLIENT_SECRET"],
+        "domain": "grupomainjobs.sharepoint.com",
+        "site_name": "EIP",  # 👈 sitio nuevo
+        "file_name": "REGISTRO GENERAL DE TÍTULOS.xlsx",  # 👈 nombre del fichero
+        # Segundos durante los que se usa el Excel descargado sin preguntar a SharePoint
+        "cache_ttl": int(st.secrets.get("EXCEL_CACHE_TTL", 300)),
+    }
+
 
 FILENAME = "REGISTRO_GENERAL_TITULOS.xlsx"
+CACHE_META = FILENAME + ".meta.json"
 
 
-def get_access_token(config):
-    authority = f"https://login.microsoftonline.com/{config['tenant_id']}"
-    app = ConfidentialClientApplication(
-        client_id=config["client_id"],
-        client_credential=config["client_secret"],
-        authority=authority,
-    )
-    result = app.acquire_token_for_client(
-        scopes=["https://graph.microsoft.com/.default"]
+def leer_meta_cache(meta_path=CACHE_META):
+    """Metadatos (eTag, cTag, fecha...) de la última descarga del Excel, si existen."""
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def guardar_meta_cache(meta, meta_path=CACHE_META):
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def cache_vigente(ttl, filename=FILENAME, meta_path=CACHE_META):
+    """True si el Excel local se comprobó hace menos de `ttl` segundos."""
+    meta = leer_meta_cache(meta_path)
+    return (
+        meta is not None
+        and os.path.exists(filename)
+        and time.time() - meta.get("comprobado", 0) < ttl
     )
-    return result.get("access_token", None)
 
 
-def get_site_id(config, token):
-    headers = {"Authorization": f"Bearer {token}"}
+def get_item_metadata(drive_id, item_id, token, etag=None):
+    """
+    Pide solo los metadatos del archivo. Si se pasa el eTag conocido y el
+    archivo no ha cambiado, Graph responde 304 y se devuelve {}.
+    """
+    import graph_client
+    import sharepoint_auth
+
+    headers = {"If-None-Match": etag} if etag else None
     url = (
-        f"https://graph.microsoft.com/v1.0/sites/"
-        f"{config['domain']}:/sites/{config['site_name']}"
+        f"{graph_client.GRAPH}/drives/{drive_id}/items/{item_id}"
+        "?$select=id,eTag,cTag,lastModifiedDateTime,size"
     )
-    res = requests.get(url, headers=headers)
-    if res.ok:
-        return res.json()["id"]
-    else:
-        st.error(f"Error al obtener site_id: {res.status_code}, {res.text}")
+    try:
+        res = graph_client.get(url, token=token, headers=headers)
+    except OSError as e:
+        st.error(f"Error al obtener metadatos del archivo: {e}")
         return None
 
-
-def get_drive_id(site_id, token):
-    """Obtiene el drive (biblioteca de Documentos) por defecto del sitio."""
-    headers = {"Authorization": f"Bearer {token}"}
-    url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/drive"
-    res = requests.get(url, headers=headers)
+    if res.status_code == 304:
+        return {}
     if res.ok:
-        return res.json()["id"]
-    else:
-        st.error(f"Error al obtener drive_id: {res.status_code}, {res.text}")
+        return res.json()
+    if res.status_code == 404:
+        # El archivo se ha movido o recreado: volver a buscarlo la próxima vez
+        sharepoint_auth.olvidar_ids()
+    st.error(f"Error al obtener metadatos del archivo: {res.status_code}, {res.text}")
+    return None
+
+
+def download_excel(drive_id, item_id, token, filename=FILENAME):
+    """Descarga el archivo dado su item_id dentro del drive (en streaming a disco)."""
+    import graph_client
+
+    url = f"{graph_client.GRAPH}/drives/{drive_id}/items/{item_id}/content"
+    try:
+        with metricas.medir("descarga_excel"):
+            escritos = graph_client.descargar(url, token, filename)
+        metricas.contar("descarga_bytes", escritos)
+        return filename
+    except (graph_client.ErrorGraph, OSError) as e:
+        st.error(f"Error al descargar archivo: {e}")
         return None
 
 
-def find_file_in_drive(drive_id, file_name, token):
+def download_excel_cached(drive_id, item_id, token, filename=FILENAME, meta_path=CACHE_META):
     """
-    Busca el archivo por nombre dentro del drive.
-    Devuelve el item_id del primer archivo que coincida.
+    Devuelve el Excel local si sigue siendo la misma versión que en SharePoint
+    (mismo eTag/cTag/fecha de modificación) y solo lo descarga si ha cambiado.
     """
-    headers = {"Authorization": f"Bearer {token}"}
-    url = (
-        f"https://graph.microsoft.com/v1.0/drives/{drive_id}"
-        f"/root/search(q='{file_name}')"
+    meta = leer_meta_cache(meta_path)
+    misma_fuente = (
+        meta is not None
+        and meta.get("item_id") == item_id
+        and os.path.exists(filename)
     )
-    res = requests.get(url, headers=headers)
-    if not res.ok:
-        st.error(f"Error al buscar el archivo: {res.status_code}, {res.text}")
-        return None
 
-    data = res.json()
-    items = data.get("value", [])
-    if not items:
-        st.error(f"No se ha encontrado ningún archivo llamado '{file_name}' en el sitio.")
+    with metricas.medir("metadatos_excel"):
+        remoto = get_item_metadata(
+            drive_id, item_id, token, etag=meta.get("eTag") if misma_fuente else None
+        )
+    if remoto is None:
         return None
 
-    # Intentar coincidencia exacta por nombre
-    for item in items:
-        if item.get("name") == file_name:
-            return item.get("id")
-
-    # Si no hay exacta, coger el primero
-    return items[0].get("id")
+    sin_cambios = misma_fuente and (
+        remoto == {}
+        or (
+            remoto.get("eTag") == meta.get("eTag")
+            and remoto.get("cTag") == meta.get("cTag")
+            and remoto.get("lastModifiedDateTime") == meta.get("lastModifiedDateTime")
+        )
+    )
 
+    metricas.contar("comprobaciones_excel", resultado="sin_cambios" if sin_cambios else "descarga")
+    if not sin_cambios:
+        if not download_excel(drive_id, item_id, token, filename):
+            return None
+        meta = {
+            "item_id": item_id,
+            "eTag": remoto.get("eTag"),
+            "cTag": remoto.get("cTag"),
+            "lastModifiedDateTime": remoto.get("lastModifiedDateTime"),
+            "size": remoto.get("size"),
+        }
+
+    meta["comprobado"] = time.time()
+    guardar_meta_cache(meta, meta_path)
+    return filename
+
+
+def obtener_excel_sharepoint(config):
+    """Resuelve token, sitio, drive y archivo y devuelve la ruta del Excel local actualizado."""
+    import sharepoint_auth
+
+    try:
+        # 1️⃣ Token (reutilizado mientras siga vigente)
+        with metricas.medir("token_msal"):
+            token = sharepoint_auth.get_token(config)
+
+        # 2️⃣ ID del sitio EIP, 3️⃣ Drive (Documentos) y 4️⃣ archivo (memorizados)
+        with metricas.medir("resolver_ids_graph"):
+            site_id = sharepoint_auth.get_site_id(config)
+            drive_id = sharepoint_auth.get_drive_id(config, site_id)
+            item_id = sharepoint_auth.find_file_in_drive(config, drive_id, config["file_name"])
+    except sharepoint_auth.ErrorSharePoint as e:
+        st.error(str(e))
+        return None
 
-def download_excel(drive_id, item_id, token, filename=FILENAME):
-    """Descarga el archivo dado su item_id dentro del drive."""
-    headers = {"Authorization": f"Bearer {token}"}
-    url = f"https://graph.microsoft.com/v1.0/drives/{drive_id}/items/{item_id}/content"
-    res = requests.get(url, headers=headers)
-    if res.ok:
-        with open(filename, "wb") as f:
-            f.write(res.content)
-        return filename
-    else:
-        st.error(f"Error al descargar archivo: {res.status_code}, {res.text}")
+    # 5️⃣ Descargar Excel
+    archivo = download_excel_cached(drive_id, item_id, token)
+    if not archivo:
+        st.error("No se pudo descargar el archivo Excel.")
         return None
 
+    return archivo
 
-def main():
+
+def mostrar_pagina():
     st.title("📚 Expedición modular de títulos")
 
-    # 1️⃣ Token
-    token = get_access_token(config)
-    if not token:
-        st.error("No se pudo obtener token de autenticación.")
-        return
-
-    # 2️⃣ ID del sitio EIP
-    site_id = get_site_id(config, token)
-    if not site_id:
-        st.error("No se pudo obtener ID del sitio.")
-        return
-
-    # 3️⃣ Drive (Documentos) del sitio
-    drive_id = get_drive_id(site_id, token)
-    if not drive_id:
-        st.error("No se pudo obtener el drive del sitio.")
-        return
-
-    # 4️⃣ Buscar archivo por nombre
-    item_id = find_file_in_drive(drive_id, config["file_name"], token)
-    if not item_id:
-        return  # ya se ha mostrado el error correspondiente
+    # pandas, openpyxl, requests y msal se importan después del primer pintado
+    with metricas.medir("imports_diferidos"):
+        from hojas.utils.buscador_utils import mostrar_buscador
+        from hojas.utils.excel_utils import cargar_hoja, listar_hojas
 
-    # 5️⃣ Descargar Excel
-    archivo = download_excel(drive_id, item_id, token)
-    if not archivo:
-        st.error("No se pudo descargar el archivo Excel.")
-        return
-
-    # 6️⃣ Cargar hojas del Excel
-    all_sheets = pd.read_excel(archivo, sheet_name=None, header=2)
-
-    hoja = st.selectbox("Selecciona una hoja", list(all_sheets.keys()))
-    df = all_sheets[hoja]
-
-    # 7️⃣ Llamar al módulo específico según la hoja
-    if hoja == "DPO-CIBERCOMPLIANCE":
-        run_dpo_ciber(df)
-    elif hoja == "COMPLIANCE-DPO":
-        run_compliance(df)
-    elif hoja == "RRHH":
-        run_rrhh(df)
-    elif hoja == "DFINANCIERA":
-        run_dfinanciera(df)
-    elif hoja == "BIM":
-        run_bim(df)
-    elif hoja == "LOGÍSTICA":
-        run_logistica(df)
-    elif hoja == "EERR":
-        run_eerr(df)
-    elif hoja == "DF-SAP":
-        run_df_sap(df)
-    elif hoja == "CIBER":
-        run_ciber(df)
-    elif hoja == "PYTHON":
-        run_python(df)
-    elif hoja == "FULLSTACK":
-        run_fullstack(df)
+    config = leer_config()
+
+    # 0️⃣ Si el Excel se comprobó hace poco, no hace falta hablar con SharePoint
+    if cache_vigente(config["cache_ttl"]):
+        metricas.contar("comprobaciones_excel", resultado="ttl")
+        archivo = FILENAME
     else:
-        st.warning(f"No hay módulo implementado aún para '{hoja}'")
-        st.dataframe(df)
+        with metricas.medir("sharepoint"):
+            archivo = obtener_excel_sharepoint(config)
+        if not archivo:
+            return
+
+    # 🔎 Buscador de alumnos en todas las hojas
+    with metricas.medir("buscador"):
+        mostrar_buscador(archivo)
+
+    # 6️⃣ Hoja seleccionada (parseada y preparada una vez por versión del Excel)
+    with metricas.medir("listar_hojas"):
+        hojas = listar_hojas(archivo)
+    hoja = st.selectbox("Selecciona una hoja", hojas, key="hoja_seleccionada")
+
+    # 7️⃣ Expedición según el registro de hojas (el motor se carga solo al usarlo)
+    with metricas.medir("expedicion", hoja=hoja):
+        if hoja in REGISTRO:
+            from hojas import expedicion
+
+            expedicion.run(archivo, hoja)
+        else:
+            st.warning(f"No hay módulo implementado aún para '{hoja}'")
+            st.dataframe(cargar_hoja(archivo, hoja))
+
+
+def main():
+    # ⏱️ Cada ejecución de la página deja su traza, las métricas y (opcionalmente) el panel
+    metricas.iniciar_traza()
+    try:
+        with metricas.medir("pagina"):
+            mostrar_pagina()
+    finally:
+        metricas.volcar_prometheus()
+    metricas.mostrar_panel_diagnostico()
 
 
 if __name__ == "__main__":
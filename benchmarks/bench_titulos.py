@@ -0,0 +1,427 @@
+"""
+Benchmark del camino caliente de la expedición de títulos.
+
+Cada caso se mide en un intérprete nuevo (cachés en memoria vacías y pico de
+memoria propio):
+
+- excel: pd.read_excel de un registro sintético de 1k/10k/100k filas,
+  cargar_hoja en frío (creando la instantánea) y desde la instantánea, y la
+  preparación de la vista de expedición.
+- plantilla: las 17 plantillas del registro; latencia por título de
+  generar_documento (sin y con la caché de resultados) y de
+  reemplazar_campos_en_docx, títulos por segundo y tamaño de salida.
+- sharepoint (opcional, --sharepoint): token, resolución de IDs y descarga del
+  registro real. Necesita CLIENT_ID, TENANT_ID y CLIENT_SECRET en el entorno.
+
+Uso:
+    python benchmarks/bench_titulos.py [--filas 1000 10000 100000] [--diplomas 50]
+                                       [--json bench.json] [--comparar bench_anterior.json]
+
+Los registros sintéticos se guardan en --trabajo y se reutilizan entre ejecuciones.
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from hojas.registro import COLUMNAS_REQUERIDAS, plantillas_registradas, ruta_plantilla  # noqa: E402
+
+FILAS_POR_DEFECTO = [1000, 10000, 100000]
+DIPLOMAS_POR_DEFECTO = 50
+HOJA = "BIM"
+FILA_CABECERA = 2  # igual que excel_utils.FILA_CABECERA
+SEMILLA = 20240507
+
+NOMBRES = ["LUCÍA", "HUGO", "MARÍA JOSÉ", "MARTÍN", "SOFÍA", "ÁLVARO", "PAULA", "JOSÉ LUIS", "NEREA", "IÑAKI"]
+APELLIDOS = ["GARCÍA", "FERNÁNDEZ", "GONZÁLEZ", "RODRÍGUEZ", "LÓPEZ", "MARTÍNEZ", "SÁNCHEZ", "PÉREZ", "NÚÑEZ", "IBÁÑEZ"]
+CURSO = "MÁSTER EN BIM MANAGEMENT"
+LETRAS_DNI = "TRWAGMYFPDXBNJZSQVHLCKE"
+
+# Métricas en las que un valor mayor es peor (para --comparar)
+METRICAS_MS = ("_ms", "_p50", "_p95", "_media")
+
+
+# ==============================
+# 🧪 Datos sintéticos
+# ==============================
+def filas_sinteticas(n: int, semilla: int = SEMILLA):
+    """Filas del registro con todas las columnas requeridas; 1 de cada 10 fechas va como texto."""
+    aleatorio = random.Random(semilla)
+    base = datetime.datetime(2020, 1, 1)
+    for i in range(n):
+        numero = aleatorio.randrange(10_000_000, 99_999_999)
+        fecha = base + datetime.timedelta(days=aleatorio.randrange(1500))
+        yield {
+            "NOMBRE": aleatorio.choice(NOMBRES),
+            "APELLIDOS": f"{aleatorio.choice(APELLIDOS)} {aleatorio.choice(APELLIDOS)}",
+            "DNI ALUMNO": f"{numero}{LETRAS_DNI[numero % 23]}",
+            "Nº TITULO": f"EIP-{i + 1:06d}",
+            "FECHA": fecha.strftime("%d/%m/%Y") if i % 10 == 0 else fecha,
+            "FECHA EXPEDICIÓN": fecha + datetime.timedelta(days=30),
+            "NOMBRE CURSO EXACTO EN TITULO": CURSO,
+            "PROMOCION EN LA QUE FINALIZA": f"PROMOCIÓN {i % 40 + 1}",
+        }
+
+
+def registro_sintetico(filas: int, trabajo: str) -> str:
+    """Ruta de un .xlsx con la hoja HOJA y `filas` alumnos (se crea una sola vez)."""
+    ruta = os.path.join(trabajo, f"registro_{filas}.xlsx")
+    if os.path.exists(ruta):
+        return ruta
+
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(HOJA)
+    for _ in range(FILA_CABECERA):
+        hoja.append([])
+    hoja.append(COLUMNAS_REQUERIDAS)
+    for fila in filas_sinteticas(filas):
+        hoja.append([fila[c] for c in COLUMNAS_REQUERIDAS])
+
+    libro.save(ruta + ".tmp")
+    os.replace(ruta + ".tmp", ruta)
+    return ruta
+
+
+# ==============================
+# ⏱️ Medición
+# ==============================
+def _ms(inicio: float) -> float:
+    return (time.perf_counter() - inicio) * 1000
+
+
+def _pico_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _resumen(latencias: list, prefijo: str) -> dict:
+    ordenadas = sorted(latencias)
+    return {
+        f"{prefijo}_p50": round(statistics.median(ordenadas), 3),
+        f"{prefijo}_p95": round(ordenadas[math.ceil(len(ordenadas) * 0.95) - 1], 3),
+        f"{prefijo}_media": round(statistics.fmean(ordenadas), 3),
+        f"{prefijo}_por_segundo": round(1000 * len(ordenadas) / sum(ordenadas), 1) if sum(ordenadas) else None,
+    }
+
+
+def caso_excel(ruta: str) -> dict:
+    import pandas as pd
+    from hojas.utils import excel_utils
+    from hojas.expedicion import obtener_vista
+
+    t = time.perf_counter()
+    filas = len(pd.read_excel(ruta, sheet_name=HOJA, header=FILA_CABECERA))
+    read_excel_ms = _ms(t)
+
+    t = time.perf_counter()
+    excel_utils.cargar_hoja(ruta, HOJA)
+    cargar_hoja_frio_ms = _ms(t)  # incluye crear la instantánea
+
+    t = time.perf_counter()
+    obtener_vista(ruta, HOJA)
+    vista_ms = _ms(t)
+
+    return {
+        "filas": filas,
+        "tamano_excel_bytes": os.path.getsize(ruta),
+        "read_excel_ms": round(read_excel_ms, 1),
+        "cargar_hoja_frio_ms": round(cargar_hoja_frio_ms, 1),
+        "preparar_vista_ms": round(vista_ms, 1),
+    }
+
+
+def caso_instantanea(ruta: str) -> dict:
+    """cargar_hoja en un proceso nuevo con la instantánea ya creada por caso_excel."""
+    from hojas.utils import excel_utils
+
+    t = time.perf_counter()
+    excel_utils.cargar_hoja(ruta, HOJA)
+    return {"cargar_hoja_instantanea_ms": round(_ms(t), 1)}
+
+
+def caso_plantilla(fichero: str, diplomas: int) -> dict:
+    import pandas as pd
+    from hojas.utils import resultados_utils
+    from hojas.utils.plantilla_utils import (
+        construir_campos,
+        generar_documento,
+        obtener_plantilla_indexada,
+        reemplazar_campos_en_docx,
+    )
+
+    ruta = ruta_plantilla(fichero)
+    alumnos = [pd.Series(fila) for fila in filas_sinteticas(diplomas)]
+
+    # Sin caché de resultados: se mide el renderizado
+    resultados_utils.MAX_BYTES = 0
+    t = time.perf_counter()
+    generar_documento(alumnos[0], ruta)
+    primera_ms = _ms(t)  # incluye cargar y preparar la plantilla
+
+    latencias, tamanos = [], []
+    for alumno in alumnos:
+        t = time.perf_counter()
+        _, datos = generar_documento(alumno, ruta)
+        latencias.append(_ms(t))
+        tamanos.append(len(datos))
+
+    reemplazos = []
+    for alumno in alumnos:
+        campos = construir_campos(alumno)
+        doc, indice = obtener_plantilla_indexada(ruta)
+        t = time.perf_counter()
+        reemplazar_campos_en_docx(doc, campos, indice)
+        reemplazos.append(_ms(t))
+
+    # Con caché de resultados (segunda petición del mismo título)
+    with tempfile.TemporaryDirectory() as directorio:
+        resultados_utils.DIRECTORIO_RESULTADOS = directorio
+        resultados_utils.MAX_BYTES = 1024 ** 3
+        for alumno in alumnos:
+            generar_documento(alumno, ruta)
+        aciertos = []
+        for alumno in alumnos:
+            t = time.perf_counter()
+            generar_documento(alumno, ruta)
+            aciertos.append(_ms(t))
+
+    return {
+        "plantilla": fichero,
+        "diplomas": diplomas,
+        "tamano_plantilla_bytes": os.path.getsize(ruta),
+        "primera_ms": round(primera_ms, 1),
+        **_resumen(latencias, "generar_documento"),
+        **_resumen(reemplazos, "reemplazar_campos"),
+        **_resumen(aciertos, "generar_documento_cache"),
+        "tamano_salida_bytes": round(statistics.fmean(tamanos)),
+    }
+
+
+def caso_sharepoint(trabajo: str) -> dict:
+    config = {
+        "client_id": os.getenv("CLIENT_ID"),
+        "tenant_id": os.getenv("TENANT_ID"),
+        "client_secret": os.getenv("CLIENT_SECRET"),
+        "domain": os.getenv("SHAREPOINT_DOMAIN", "grupomainjobs.sharepoint.com"),
+        "site_name": os.getenv("SHAREPOINT_SITE", "EIP"),
+        "file_name": os.getenv("SHAREPOINT_FILE", "REGISTRO GENERAL DE TÍTULOS.xlsx"),
+    }
+    if not all(config[c] for c in ("client_id", "tenant_id", "client_secret")):
+        return {"omitido": "faltan CLIENT_ID, TENANT_ID o CLIENT_SECRET en el entorno"}
+
+    import graph_client
+    import sharepoint_auth
+
+    t = time.perf_counter()
+    token = sharepoint_auth.get_token(config)
+    token_ms = _ms(t)
+
+    t = time.perf_counter()
+    site_id = sharepoint_auth.get_site_id(config)
+    drive_id = sharepoint_auth.get_drive_id(config, site_id)
+    item_id = sharepoint_auth.find_file_in_drive(config, drive_id, config["file_name"])
+    ids_ms = _ms(t)
+
+    t = time.perf_counter()
+    url = f"{graph_client.GRAPH}/drives/{drive_id}/items/{item_id}/content"
+    escritos = graph_client.descargar(url, token, os.path.join(trabajo, "registro_sharepoint.xlsx"))
+    descarga_ms = _ms(t)
+
+    return {
+        "token_ms": round(token_ms, 1),
+        "resolver_ids_ms": round(ids_ms, 1),
+        "descarga_ms": round(descarga_ms, 1),
+        "descarga_bytes": escritos,
+        "descarga_mb_por_segundo": round(escritos / 1e6 / (descarga_ms / 1000), 2) if descarga_ms else None,
+    }
+
+
+CASOS = {
+    "excel": lambda args: caso_excel(args.objetivo),
+    "instantanea": lambda args: caso_instantanea(args.objetivo),
+    "plantilla": lambda args: caso_plantilla(args.objetivo, args.diplomas),
+    "sharepoint": lambda args: caso_sharepoint(args.trabajo),
+}
+
+
+# ==============================
+# 🚀 Orquestación
+# ==============================
+def _lanzar(caso: str, objetivo: str, args, entorno: dict) -> dict:
+    """Ejecuta un caso en un intérprete nuevo y devuelve su resultado."""
+    proceso = subprocess.run(
+        [
+            sys.executable, os.path.abspath(__file__),
+            "--caso", caso, "--objetivo", objetivo,
+            "--diplomas", str(args.diplomas), "--trabajo", args.trabajo,
+        ],
+        cwd=RAIZ,
+        env=entorno,
+        capture_output=True,
+        text=True,
+    )
+    if proceso.returncode != 0:
+        return {"error": proceso.stderr.strip().splitlines()[-1] if proceso.stderr.strip() else "sin salida"}
+    return json.loads(proceso.stdout.strip().splitlines()[-1])
+
+
+def _version() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def ejecutar(args) -> dict:
+    os.makedirs(args.trabajo, exist_ok=True)
+    resultado = {"version": _version(), "excel": [], "plantillas": [], "sharepoint": None}
+
+    for filas in args.filas:
+        print(f"📄 Registro sintético de {filas} filas…", file=sys.stderr)
+        ruta = registro_sintetico(filas, args.trabajo)
+        with tempfile.TemporaryDirectory() as snapshots:
+            entorno = {**os.environ, "TITULOS_SNAPSHOTS": snapshots}
+            medida = _lanzar("excel", ruta, args, entorno)
+            instantanea = _lanzar("instantanea", ruta, args, entorno)
+        medida["pico_rss_mb"] = medida.pop("_pico_rss_mb", None)
+        instantanea["pico_rss_instantanea_mb"] = instantanea.pop("_pico_rss_mb", None)
+        medida.update(instantanea)
+        resultado["excel"].append({"filas_pedidas": filas, **medida})
+
+    entorno = {**os.environ, "TITULOS_CACHE_RESULTADOS_MB": "0"}
+    for fichero in sorted({os.path.basename(ruta) for ruta in plantillas_registradas()}):
+        print(f"🖨️ {fichero}…", file=sys.stderr)
+        medida = _lanzar("plantilla", fichero, args, entorno)
+        medida["pico_rss_mb"] = medida.pop("_pico_rss_mb", None)
+        resultado["plantillas"].append({"plantilla": fichero, **medida})
+
+    if args.sharepoint:
+        print("☁️ SharePoint…", file=sys.stderr)
+        resultado["sharepoint"] = _lanzar("sharepoint", "", args, dict(os.environ))
+
+    return resultado
+
+
+def _planas(resultado: dict) -> dict:
+    """{"excel[1000].read_excel_ms": valor, ...} para comparar dos ejecuciones."""
+    planas = {}
+    for medida in resultado.get("excel", []):
+        for clave, valor in medida.items():
+            planas[f"excel[{medida['filas_pedidas']}].{clave}"] = valor
+    for medida in resultado.get("plantillas", []):
+        for clave, valor in medida.items():
+            planas[f"{medida['plantilla']}.{clave}"] = valor
+    for clave, valor in (resultado.get("sharepoint") or {}).items():
+        planas[f"sharepoint.{clave}"] = valor
+    return planas
+
+
+def comparar(anterior: dict, actual: dict, umbral: float = 0.10) -> list:
+    """Métricas de tiempo que han empeorado más de `umbral` respecto a la ejecución anterior."""
+    antes, ahora = _planas(anterior), _planas(actual)
+    peores = []
+    for clave, valor in ahora.items():
+        previo = antes.get(clave)
+        if not clave.endswith(METRICAS_MS) or not isinstance(valor, (int, float)) or not previo:
+            continue
+        cambio = (valor - previo) / previo
+        if cambio > umbral:
+            peores.append((clave, previo, valor, cambio))
+    return sorted(peores, key=lambda x: -x[3])
+
+
+def imprimir(resultado: dict):
+    print("\nRegistro (pd.read_excel / cargar_hoja):")
+    for m in resultado["excel"]:
+        if "error" in m:
+            print(f"  {m['filas_pedidas']:>7} filas  ❌ {m['error']}")
+            continue
+        print(
+            f"  {m['filas']:>7} filas  read_excel {m['read_excel_ms']:8.0f} ms  "
+            f"frío {m['cargar_hoja_frio_ms']:8.0f} ms  instantánea {m['cargar_hoja_instantanea_ms']:6.0f} ms  "
+            f"vista {m['preparar_vista_ms']:6.0f} ms  pico {m['pico_rss_mb']} MB"
+        )
+
+    print("\nPlantillas (generar_documento, p50 por título):")
+    for m in resultado["plantillas"]:
+        if "error" in m:
+            print(f"  {m['plantilla']:<42} ❌ {m['error']}")
+            continue
+        print(
+            f"  {m['plantilla']:<42} {m['generar_documento_p50']:7.1f} ms  "
+            f"{m['generar_documento_por_segundo']:6.1f}/s  reemplazo {m['reemplazar_campos_p50']:5.2f} ms  "
+            f"caché {m['generar_documento_cache_p50']:5.2f} ms  "
+            f"{m['tamano_salida_bytes'] / 1e6:5.2f} MB  pico {m['pico_rss_mb']} MB"
+        )
+
+    if resultado["sharepoint"] is not None:
+        print("\nSharePoint:")
+        for clave, valor in resultado["sharepoint"].items():
+            print(f"  {clave}: {valor}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filas", type=int, nargs="+", default=FILAS_POR_DEFECTO)
+    parser.add_argument("--diplomas", type=int, default=DIPLOMAS_POR_DEFECTO, help="Títulos por plantilla")
+    parser.add_argument("--sharepoint", action="store_true", help="Medir también la descarga real")
+    parser.add_argument("--trabajo", default=os.path.join(tempfile.gettempdir(), "bench_titulos"))
+    parser.add_argument("--json", help="Guardar el resultado en este fichero")
+    parser.add_argument("--comparar", help="Resultado JSON anterior con el que comparar")
+    parser.add_argument("--umbral", type=float, default=0.10, help="Empeoramiento tolerado (0.10 = 10 %%)")
+    parser.add_argument("--caso", choices=CASOS, help=argparse.SUPPRESS)
+    parser.add_argument("--objetivo", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.caso:
+        medida = CASOS[args.caso](args)
+        medida["_pico_rss_mb"] = _pico_rss_mb()
+        print(json.dumps(medida, ensure_ascii=False))
+        return
+
+    resultado = ejecutar(args)
+    imprimir(resultado)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            peores = comparar(json.load(f), resultado, args.umbral)
+        print(f"\nComparación con {args.comparar}:")
+        for clave, previo, valor, cambio in peores:
+            print(f"  ❌ {clave}: {previo} -> {valor} (+{cambio:.0%})")
+        if not peores:
+            print("  ✅ sin empeoramientos")
+        sys.exit(1 if peores else 0)
+
+
+if __name__ == "__main__":
+    main()
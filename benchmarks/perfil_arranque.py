@@ -0,0 +1,133 @@
+"""
+Perfil del arranque en frío de la aplicación Streamlit.
+
+Lanza un intérprete nuevo (sin módulos en memoria) que importa app.py y,
+después, los módulos que se cargan de forma diferida, y muestra:
+
+- El tiempo de importar app.py (lo que tarda el primer pintado) frente al
+  presupuesto, con los módulos que más pesan (python -X importtime).
+- Lo que cuesta cada módulo diferido cuando por fin se usa.
+
+Uso:
+    python benchmarks/perfil_arranque.py [--presupuesto-ms 500] [--json perfil.json]
+
+Sale con código 1 si el arranque supera el presupuesto.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PRESUPUESTO_MS = 500
+
+# Lo que se carga después del primer pintado, en el orden en que lo pide la app
+DIFERIDOS = [
+    "hojas.utils.excel_utils",
+    "hojas.utils.buscador_utils",
+    "sharepoint_auth",
+    "msal",
+    "hojas.expedicion",
+    "docx",
+]
+
+CODIGO = """
+import importlib, json, sys, time
+t = time.perf_counter()
+import app
+tiempos = {"app": (time.perf_counter() - t) * 1000}
+for modulo in sys.argv[1:]:
+    t = time.perf_counter()
+    importlib.import_module(modulo)
+    tiempos[modulo] = (time.perf_counter() - t) * 1000
+print(json.dumps(tiempos))
+"""
+
+
+def _lanzar() -> tuple:
+    entorno = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CODIGO, *DIFERIDOS],
+        cwd=RAIZ,
+        env=entorno,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    tiempos = json.loads(proceso.stdout.strip().splitlines()[-1])
+    return tiempos, proceso.stderr
+
+
+def _modulos_de_app(importtime: str) -> list:
+    """[(modulo, propio_ms, acumulado_ms)] de los imports directos de app.py."""
+    directos = []
+    for linea in importtime.splitlines():
+        # "import time:   propio |   acumulado |   <sangría>modulo" (en microsegundos)
+        if not linea.startswith("import time:"):
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        if not propio.strip().isdigit():
+            continue  # cabecera
+        nombre = nombre[1:]
+        if nombre.strip() == "app":
+            break
+        nivel = (len(nombre) - len(nombre.lstrip())) // 2
+        # importtime escribe los hijos antes que su padre: lo de nivel 1 que
+        # queda detrás del último módulo de nivel 0 anterior a app es de app
+        if nivel == 0:
+            directos = []
+        elif nivel == 1:
+            directos.append((nombre.strip(), int(propio) / 1000, int(acumulado) / 1000))
+    return directos
+
+
+def perfil(repeticiones: int = 3) -> dict:
+    """Mejor de `repeticiones` arranques en frío (el primero suele pagar la caché del disco)."""
+    mejor, detalle = None, ""
+    for _ in range(repeticiones):
+        tiempos, importtime = _lanzar()
+        if mejor is None or tiempos["app"] < mejor["app"]:
+            mejor, detalle = tiempos, importtime
+
+    return {
+        "arranque_ms": round(mejor["app"], 1),
+        "diferidos_ms": {m: round(mejor[m], 1) for m in DIFERIDOS},
+        "imports_app": [
+            {"modulo": m, "propio_ms": round(p, 1), "acumulado_ms": round(a, 1)}
+            for m, p, a in sorted(_modulos_de_app(detalle), key=lambda x: -x[2])
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--presupuesto-ms", type=float, default=PRESUPUESTO_MS)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", help="Guardar el resultado en este fichero")
+    args = parser.parse_args()
+
+    resultado = perfil(args.repeticiones)
+    resultado["presupuesto_ms"] = args.presupuesto_ms
+    dentro = resultado["arranque_ms"] <= args.presupuesto_ms
+
+    print(f"Importar app.py: {resultado['arranque_ms']:.0f} ms "
+          f"(presupuesto {args.presupuesto_ms:.0f} ms) {'✅' if dentro else '❌'}")
+    print("\nImports de app.py que más pesan:")
+    for fila in resultado["imports_app"][:args.top]:
+        print(f"  {fila['acumulado_ms']:8.1f} ms  {fila['modulo']}")
+    print("\nMódulos diferidos (coste al usarse por primera vez):")
+    for modulo, ms in resultado["diferidos_ms"].items():
+        print(f"  {ms:8.1f} ms  {modulo}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+    sys.exit(0 if dentro else 1)
+
+
+if __name__ == "__main__":
+    main()
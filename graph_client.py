@@ -0,0 +1,122 @@
+# graph_client.py
+"""
+Cliente HTTP para Microsoft Graph compartido por toda la aplicación.
+
+- Una sola requests.Session con pool de conexiones keep-alive.
+- Timeouts acotados en todas las peticiones.
+- Reintentos con backoff exponencial respetando Retry-After en 429/503.
+- Descargas de /content en streaming directamente a disco.
+"""
+import email.utils
+import os
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+GRAPH = "https://graph.microsoft.com/v1.0"
+
+TIMEOUT = (5, 60)  # (conexión, lectura) en segundos
+MAX_REINTENTOS = 5
+BACKOFF_BASE_S = 0.5
+BACKOFF_MAX_S = 60
+ESTADOS_REINTENTABLES = (429, 500, 502, 503, 504)
+TAMANO_TROZO = 1024 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class ErrorGraph(RuntimeError):
+    """Respuesta de error de Graph (tras agotar los reintentos)."""
+
+    def __init__(self, status_code, texto):
+        super().__init__(f"{status_code}, {texto}")
+        self.status_code = status_code
+        self.texto = texto
+
+
+def get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            _session.mount("https://", adaptador)
+        return _session
+
+
+def _espera(intento: int, respuesta=None) -> float:
+    """Segundos a esperar antes del siguiente intento."""
+    if respuesta is not None:
+        retry_after = respuesta.headers.get("Retry-After")
+        if retry_after:
+            if retry_after.isdigit():
+                return min(int(retry_after), BACKOFF_MAX_S)
+            try:
+                fecha = email.utils.parsedate_to_datetime(retry_after)
+            except (TypeError, ValueError):
+                fecha = None  # ni segundos enteros ni fecha HTTP ("1.5"...): backoff normal
+            if fecha is not None:
+                return min(max(fecha.timestamp() - time.time(), 0), BACKOFF_MAX_S)
+    return min(BACKOFF_BASE_S * 2 ** intento, BACKOFF_MAX_S) * random.uniform(0.8, 1.2)
+
+
+def request(method: str, url: str, token: str = None, headers: dict = None, stream: bool = False, **kwargs):
+    """
+    Petición a Graph con reintentos. Devuelve la respuesta final (sea cual sea
+    su estado); los errores de red se reintentan y, si persisten, se propagan.
+    """
+    cabeceras = dict(headers or {})
+    if token:
+        cabeceras["Authorization"] = f"Bearer {token}"
+    kwargs.setdefault("timeout", TIMEOUT)
+
+    for intento in range(MAX_REINTENTOS + 1):
+        try:
+            res = get_session().request(method, url, headers=cabeceras, stream=stream, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if intento == MAX_REINTENTOS:
+                raise
+            time.sleep(_espera(intento))
+            continue
+
+        if res.status_code not in ESTADOS_REINTENTABLES or intento == MAX_REINTENTOS:
+            return res
+
+        res.close()
+        time.sleep(_espera(intento, res))
+
+    return res
+
+
+def get(url: str, token: str = None, **kwargs):
+    return request("GET", url, token=token, **kwargs)
+
+
+def get_json(url: str, token: str = None, **kwargs) -> dict:
+    res = get(url, token=token, **kwargs)
+    if not res.ok:
+        raise ErrorGraph(res.status_code, res.text)
+    return res.json()
+
+
+def descargar(url: str, token: str, destino: str) -> int:
+    """
+    Descarga `url` en streaming a `destino` (a través de un .part que se
+    renombra al terminar). Devuelve el número de bytes escritos.
+    """
+    temporal = destino + ".part"
+    with get(url, token=token, stream=True) as res:
+        if not res.ok:
+            raise ErrorGraph(res.status_code, res.text)
+
+        escritos = 0
+        with open(temporal, "wb") as f:
+            for trozo in res.iter_content(chunk_size=TAMANO_TROZO):
+                f.write(trozo)
+                escritos += len(trozo)
+
+    os.replace(temporal, destino)
+    return escritos
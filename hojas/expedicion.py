@@ -0,0 +1,240 @@
+"""
+Expedición de títulos genérica para cualquier hoja del registro (hojas/registro.py).
+
+Sustituye a los antiguos módulos expedicion_<HOJA>.py: la comprobación de
+columnas, la limpieza de filas, la selección del alumno, la generación del
+documento y la generación por lotes son las mismas para todos los programas.
+"""
+import threading
+from collections import OrderedDict
+import streamlit as st
+import pandas as pd
+from hojas.registro import REGISTRO, columnas_requeridas, ruta_plantilla, sufijo_archivo
+from hojas.utils.excel_utils import cargar_hoja, hash_archivo, leer_fila
+from hojas.utils.fecha_utils import normalizar_fechas
+from hojas.utils.plantilla_utils import generar_documento, limpiar
+from hojas.utils.buscador_utils import alumnos_de_hoja, seleccionar_alumno
+from hojas.utils.estado_utils import marcar_emitidos
+from hojas.utils.lote_utils import mostrar_generacion_lote
+from hojas.utils.metricas_utils import medir
+
+MIME_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Vistas ya preparadas por (versión del Excel, hoja)
+MAX_VISTAS_EN_CACHE = 16
+_vistas = OrderedDict()
+_vistas_lock = threading.Lock()
+
+
+def preparar_hoja(df: pd.DataFrame, hoja: str):
+    """
+    Limpia la hoja y añade NOMBRE_COMPLETO. Devuelve (df, faltantes); si faltan
+    columnas requeridas df es None.
+    """
+    df = df.copy()
+    df.columns = df.columns.str.strip()
+
+    # 👉 Si no existe FECHA pero sí FECHA EXPEDICIÓN, la creamos
+    if "FECHA" not in df.columns and "FECHA EXPEDICIÓN" in df.columns:
+        df["FECHA"] = df["FECHA EXPEDICIÓN"]
+
+    faltantes = [c for c in columnas_requeridas(hoja) if c not in df.columns]
+    if faltantes:
+        return None, faltantes
+
+    # Limpieza básica de filas
+    df = df.dropna(how="all")
+    df = df[~df["Nº TITULO"].isna() & ~df["DNI ALUMNO"].isna()].reset_index(drop=True)
+
+    # Nombre completo para la selección
+    df["NOMBRE_COMPLETO"] = (
+        df["NOMBRE"].astype(str).str.strip()
+        + " "
+        + df["APELLIDOS"].astype(str).str.strip()
+    )
+    return df, []
+
+
+def obtener_vista(ruta: str, hoja: str) -> dict:
+    """
+    Hoja preparada (preparar_hoja) con las fechas ya formateadas, el informe de
+    fechas que no se entienden y los índices nombre -> fila y DNI -> fila.
+    Se calcula una sola vez por versión del Excel; los reruns de Streamlit solo
+    hacen búsquedas en diccionarios. El DataFrame es compartido: no modificarlo.
+    """
+    clave = (hash_archivo(ruta), hoja)
+    with _vistas_lock:
+        vista = _vistas.get(clave)
+        if vista is not None:
+            _vistas.move_to_end(clave)
+            return vista
+
+    df, faltantes = preparar_hoja(cargar_hoja(ruta, hoja), hoja)
+    vista = {
+        "df": df,
+        "faltantes": faltantes,
+        "fechas_invalidas": None,
+        "nombres": [],
+        "por_nombre": {},
+        "por_dni": {},
+    }
+    if df is not None:
+        # Fechas parseadas una sola vez (FECHA_TXT, FECHA EXPEDICIÓN_TXT)
+        vista["fechas_invalidas"] = normalizar_fechas(df)
+        # La primera fila gana, igual que el antiguo df[...].iloc[0]
+        for pos, nombre in enumerate(df["NOMBRE_COMPLETO"]):
+            vista["por_nombre"].setdefault(nombre, pos)
+        for pos, dni in enumerate(df["DNI ALUMNO"].map(limpiar).str.upper()):
+            vista["por_dni"].setdefault(dni, pos)
+        vista["nombres"] = list(vista["por_nombre"])
+
+    with _vistas_lock:
+        _vistas[clave] = vista
+        while len(_vistas) > MAX_VISTAS_EN_CACHE:
+            _vistas.popitem(last=False)
+    return vista
+
+
+def nombre_de_dni(vista: dict, dni: str):
+    """NOMBRE_COMPLETO del alumno con ese DNI (o None) sin recorrer la hoja."""
+    pos = vista["por_dni"].get(dni)
+    return None if pos is None else vista["df"].at[pos, "NOMBRE_COMPLETO"]
+
+
+def alumnos_del_indice(ruta: str, hoja: str):
+    """
+    Lo que necesita el selector de alumnos (nombres, nombre -> fila del Excel,
+    DNI -> nombre) sacado del índice del buscador, sin cargar la hoja. None si
+    el índice aún no está al día o no tiene alumnos de esta hoja.
+    """
+    alumnos = alumnos_de_hoja(ruta, hoja)
+    if not alumnos:
+        return None
+    por_nombre, por_dni = {}, {}
+    for alumno in alumnos:
+        # La primera fila gana, igual que en obtener_vista
+        por_nombre.setdefault(alumno["nombre_completo"], alumno["fila"])
+        por_dni.setdefault(alumno["dni"], alumno["nombre_completo"])
+    return {"nombres": list(por_nombre), "por_nombre": por_nombre, "por_dni": por_dni}
+
+
+def vista_de_alumno(ruta: str, hoja: str, fila: int) -> dict:
+    """Como obtener_vista, pero de una sola fila del Excel."""
+    df, faltantes = preparar_hoja(leer_fila(ruta, hoja, fila).to_frame().T.reset_index(drop=True), hoja)
+    vista = {"df": df, "faltantes": faltantes, "fechas_invalidas": None}
+    if df is not None:
+        vista["fechas_invalidas"] = normalizar_fechas(df)
+    return vista
+
+
+def hoja_valida(vista: dict, hoja: str) -> bool:
+    """Avisa si faltan columnas o no hay filas válidas."""
+    if vista["faltantes"]:
+        st.error("❌ Faltan columnas requeridas en el Excel.")
+        st.write("Esperadas:", columnas_requeridas(hoja))
+        st.write("Faltan:", vista["faltantes"])
+        return False
+
+    if vista["df"].empty:
+        st.warning("No hay registros válidos para mostrar.")
+        return False
+    return True
+
+
+def mostrar_fechas_invalidas(vista: dict):
+    """Aviso con las celdas de fecha que no se han podido interpretar."""
+    invalidas = vista["fechas_invalidas"]
+    if invalidas is None or invalidas.empty:
+        return
+
+    st.warning(
+        f"⚠️ {len(invalidas)} celdas de fecha no se han podido interpretar "
+        "(se admite dd/mm/aaaa o una fecha de Excel) y saldrán vacías en el título."
+    )
+    with st.expander("Ver fechas no válidas"):
+        df = vista["df"]
+        st.dataframe(
+            invalidas.assign(
+                **{
+                    "Nº TITULO": df.loc[invalidas["fila"], "Nº TITULO"].astype(str).values,
+                    "ALUMNO": df.loc[invalidas["fila"], "NOMBRE_COMPLETO"].values,
+                }
+            ),
+            hide_index=True,
+        )
+
+
+def run(ruta: str, hoja: str):
+    entrada = REGISTRO[hoja]
+    st.header(entrada["titulo"])
+
+    # El selector sale del índice del buscador; la hoja entera solo se carga
+    # si el índice aún no está listo o para la generación por lotes
+    with medir("alumnos_de_hoja"):
+        alumnos = alumnos_del_indice(ruta, hoja)
+    vista = None
+    if alumnos is not None:
+        nombres, nombre_por_dni = alumnos["nombres"], alumnos["por_dni"].get
+    else:
+        with medir("obtener_vista"):
+            vista = obtener_vista(ruta, hoja)
+        if not hoja_valida(vista, hoja):
+            return
+        mostrar_fechas_invalidas(vista)
+        nombres, nombre_por_dni = vista["nombres"], lambda dni: nombre_de_dni(vista, dni)
+
+    seleccionado = seleccionar_alumno(nombres, clave=f"alumno_{hoja}", nombre_por_dni=nombre_por_dni)
+
+    alias = {visible: tipo for tipo, (_, visible) in entrada["plantillas"].items()}
+    tipo_visible = st.radio(
+        "Selecciona tipo de plantilla",
+        list(alias),
+        key=f"plantilla_{hoja}"
+    )
+    tipo_plantilla = alias[tipo_visible]
+    plantilla_path = ruta_plantilla(entrada["plantillas"][tipo_plantilla][0])
+    sufijo_tipo = sufijo_archivo(hoja, tipo_plantilla)
+
+    if seleccionado:
+        if vista is None:
+            with medir("leer_alumno"):
+                vista_alumno = vista_de_alumno(ruta, hoja, alumnos["por_nombre"][seleccionado])
+            if not hoja_valida(vista_alumno, hoja):
+                return
+            mostrar_fechas_invalidas(vista_alumno)
+            alumno = vista_alumno["df"].iloc[0]
+        else:
+            alumno = vista["df"].iloc[vista["por_nombre"][seleccionado]]
+
+        st.subheader("📋 Datos del alumno")
+        st.write(alumno.astype(str))
+
+        if st.button("🖨️ Generar Documento"):
+            try:
+                nombre_docx, docx_bytes = generar_documento(
+                    alumno,
+                    plantilla_path,
+                    sufijo_tipo=sufijo_tipo
+                )
+                # El título cuenta como emitido cuando se descarga
+                st.download_button(
+                    "📥 Descargar DOCX",
+                    docx_bytes,
+                    file_name=nombre_docx,
+                    mime=MIME_DOCX,
+                    on_click=marcar_emitidos,
+                    args=([alumno.to_dict()], hoja, plantilla_path),
+                )
+            except Exception as e:
+                st.error(f"❌ Error: {e}")
+
+    # 📦 Generación masiva para una promoción completa (necesita la hoja entera)
+    if not st.toggle("📦 Generación por lotes", key=f"lotes_{hoja}"):
+        return
+    if vista is None:
+        with medir("obtener_vista"):
+            vista = obtener_vista(ruta, hoja)
+        if not hoja_valida(vista, hoja):
+            return
+        mostrar_fechas_invalidas(vista)
+    mostrar_generacion_lote(vista["df"], plantilla_path, sufijo_tipo, hoja)
@@ -0,0 +1,130 @@
+"""
+Registro declarativo de las hojas del Excel que tienen expedición de títulos.
+
+Cada entrada indica el encabezado, las plantillas disponibles (clave interna,
+fichero dentro de hojas/plantillas, que se reconstruye desde el almacén de
+plantillas, y alias visible) y, opcionalmente:
+
+- "columnas": columnas requeridas (por defecto COLUMNAS_REQUERIDAS).
+- "sufijos": sufijo del nombre de fichero por plantilla (por defecto la clave,
+  p. ej. TITULO_NORMAL_<DNI>.docx).
+
+Para añadir un programa nuevo basta con añadir aquí su entrada.
+"""
+import os
+from hojas.utils.almacen_utils import asegurar_plantilla
+
+DIRECTORIO_PLANTILLAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plantillas")
+
+COLUMNAS_REQUERIDAS = [
+    "NOMBRE",
+    "APELLIDOS",
+    "DNI ALUMNO",
+    "Nº TITULO",
+    "FECHA",
+    "FECHA EXPEDICIÓN",
+    "NOMBRE CURSO EXACTO EN TITULO",
+    "PROMOCION EN LA QUE FINALIZA",
+]
+
+SIN_CUALIFICAM = "Sin Cualificam"
+CON_CUALIFICAM = "Con Cualificam"
+
+REGISTRO = {
+    "DPO-CIBERCOMPLIANCE": {
+        "titulo": "📄 Expedición título - DPO",
+        "plantillas": {
+            "NORMAL": ("TITULO_DPO_NORMAL.docx", SIN_CUALIFICAM),
+            "CUALIFICAN": ("TITULO_DPO_CUALIFICAN.docx", CON_CUALIFICAM),
+        },
+    },
+    "COMPLIANCE-DPO": {
+        "titulo": "📜 Expedición título - Compliance y Protección de Datos",
+        "plantillas": {
+            "NORMAL": ("TITULO_COMPLIANCEDPO.docx", SIN_CUALIFICAM),
+            "CUALIFICAN": ("TITULO_COMPLIANCEDPO_CUALIFICAN.docx", CON_CUALIFICAM),
+        },
+    },
+    "RRHH": {
+        "titulo": "🧠 Expedición título - Recursos Humanos",
+        "plantillas": {
+            "NORMAL": ("TITULO_RRHH_NORMAL.docx", SIN_CUALIFICAM),
+            "CUALIFICAM (31-32)": ("TITULO_RRHH_CUALIFICAM(31-32).docx", "Con Cualificam (31-32)"),
+            "CUALIFICAM (33 en adelante)": (
+                "TITULO_RRHH_CUALIFICAM(33-EN ADELANTE).docx",
+                "Con Cualificam (33 en adelante)",
+            ),
+        },
+    },
+    "DFINANCIERA": {
+        "titulo": "📄 Expedición título - Dirección Financiera",
+        "plantillas": {
+            "NORMAL": ("TITULO_DFINANCIERA_NORMAL.docx", SIN_CUALIFICAM),
+        },
+    },
+    "BIM": {
+        "titulo": "🎓 Expedición título - Máster BIM",
+        "plantillas": {
+            "NORMAL": ("TITULO_BIM.docx", SIN_CUALIFICAM),
+        },
+    },
+    "LOGÍSTICA": {
+        "titulo": "🚛 Expedición título - LOGÍSTICA",
+        "plantillas": {
+            "NORMAL": ("TITULO_LOGISTICA.docx", SIN_CUALIFICAM),
+        },
+    },
+    "EERR": {
+        "titulo": "🎓 Expedición título - Energías Renovables",
+        "plantillas": {
+            "NORMAL": ("TITULO_EERR_NORMAL.docx", SIN_CUALIFICAM),
+            "CUALIFICAN": ("TITULO_EERR_CUALIFICAN.docx", CON_CUALIFICAM),
+        },
+    },
+    "DF-SAP": {
+        "titulo": "📄 Expedición título - SAP",
+        "plantillas": {
+            "NORMAL": ("TITULO_SAP.docx", SIN_CUALIFICAM),
+        },
+    },
+    "CIBER": {
+        "titulo": "🔐 Expedición título - CIBERSEGURIDAD",
+        "plantillas": {
+            "NORMAL": ("TITULO_CIBER_NORMAL.docx", SIN_CUALIFICAM),
+            "CUALIFICAN": ("TITULO_CIBER_CUALIFICAN.docx", CON_CUALIFICAM),
+        },
+    },
+    "PYTHON": {
+        "titulo": "🐍 Expedición título - Máster Python",
+        "plantillas": {
+            "NORMAL": ("TITULO_PYTHON.docx", SIN_CUALIFICAM),
+        },
+    },
+    "FULLSTACK": {
+        "titulo": "💻 Expedición título - Máster Full Stack",
+        "plantillas": {
+            "NORMAL": ("TITULO_FULL_NORMAL.docx", SIN_CUALIFICAM),
+        },
+    },
+}
+
+
+def ruta_plantilla(fichero: str) -> str:
+    return asegurar_plantilla(fichero, DIRECTORIO_PLANTILLAS)
+
+
+def columnas_requeridas(hoja: str) -> list:
+    return REGISTRO[hoja].get("columnas", COLUMNAS_REQUERIDAS)
+
+
+def sufijo_archivo(hoja: str, tipo_plantilla: str) -> str:
+    return REGISTRO[hoja].get("sufijos", {}).get(tipo_plantilla, tipo_plantilla)
+
+
+def plantillas_registradas() -> list:
+    """Rutas de todas las plantillas del registro (para comprobar que existen)."""
+    return [
+        ruta_plantilla(fichero)
+        for entrada in REGISTRO.values()
+        for fichero, _ in entrada["plantillas"].values()
+    ]
@@ -0,0 +1,199 @@
+"""
+Almacén direccionado por contenido de las plantillas .docx.
+
+Las 17 plantillas incrustan casi las mismas fuentes e imágenes, pero cada
+.docx ofusca sus fuentes (.odttf) con una clave propia, así que los bytes
+nunca coinciden. Al construir el almacén cada fuente se desofusca y cada
+parte se guarda una sola vez en objetos/<sha256> (comprimida con zlib); por
+plantilla solo queda un manifiesto JSON con la lista de partes, su hash y,
+para las fuentes, la clave con la que se vuelve a ofuscar.
+
+El almacén (unos 3,6 MB frente a 47 MB de .docx) es lo que está en el
+repositorio; los .docx de hojas/plantillas no se versionan y se reconstruyen
+la primera vez que se piden (asegurar_plantilla, desde registro.ruta_plantilla).
+Después de editar una plantilla en Word hay que volver a construir el almacén:
+
+    python -m hojas.utils.almacen_utils construir   # plantillas -> almacén
+    python -m hojas.utils.almacen_utils restaurar   # almacén -> plantillas
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import zipfile
+import zlib
+
+DIRECTORIO_PLANTILLAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "plantillas")
+DIRECTORIO_ALMACEN = os.getenv("TITULOS_ALMACEN", os.path.join(DIRECTORIO_PLANTILLAS, ".almacen"))
+
+TABLA_FUENTES = "word/fontTable.xml"
+RELACIONES_FUENTES = "word/_rels/fontTable.xml.rels"
+_EMBED = re.compile(r'<w:embed\w+ r:id="([^"]+)" w:fontKey="\{([0-9A-Fa-f-]+)\}"')
+_RELACION = re.compile(r"<Relationship\b[^>]*>")
+_ATRIBUTO = re.compile(r'(\w+)="([^"]*)"')
+
+_lock = threading.Lock()
+
+
+def _clave_ofuscacion(guid: str) -> bytes:
+    """Clave de 16 bytes de un fontKey (GUID en orden inverso de bytes)."""
+    return bytes.fromhex(guid.replace("-", ""))[::-1]
+
+
+def ofuscar(datos: bytes, guid: str) -> bytes:
+    """Ofusca/desofusca una fuente .odttf (XOR de los 32 primeros bytes; es simétrico)."""
+    clave = _clave_ofuscacion(guid)
+    cabecera = bytes(b ^ clave[i % 16] for i, b in enumerate(datos[:32]))
+    return cabecera + datos[32:]
+
+
+def _claves_fuentes(zf: zipfile.ZipFile) -> dict:
+    """{ruta de la fuente dentro del ZIP: fontKey} según fontTable.xml y sus relaciones."""
+    if TABLA_FUENTES not in zf.namelist() or RELACIONES_FUENTES not in zf.namelist():
+        return {}
+
+    destinos = {}
+    for relacion in _RELACION.findall(zf.read(RELACIONES_FUENTES).decode("utf-8")):
+        atributos = dict(_ATRIBUTO.findall(relacion))
+        destinos[atributos.get("Id")] = "word/" + atributos.get("Target", "").lstrip("/")
+
+    return {
+        destinos[rid]: guid
+        for rid, guid in _EMBED.findall(zf.read(TABLA_FUENTES).decode("utf-8"))
+        if rid in destinos
+    }
+
+
+def _guardar_objeto(almacen: str, datos: bytes) -> str:
+    digest = hashlib.sha256(datos).hexdigest()
+    ruta = os.path.join(almacen, "objetos", digest)
+    if not os.path.exists(ruta):
+        temporal = ruta + ".tmp"
+        with open(temporal, "wb") as f:
+            f.write(zlib.compress(datos, 9))
+        os.replace(temporal, ruta)
+    return digest
+
+
+def _leer_objeto(almacen: str, digest: str) -> bytes:
+    with open(os.path.join(almacen, "objetos", digest), "rb") as f:
+        return zlib.decompress(f.read())
+
+
+def construir_almacen(plantillas: str = DIRECTORIO_PLANTILLAS, almacen: str = DIRECTORIO_ALMACEN) -> dict:
+    """
+    Guarda todas las plantillas de `plantillas` en el almacén y borra los
+    objetos que ya no usa ninguna. Devuelve el tamaño antes y después.
+    """
+    os.makedirs(os.path.join(almacen, "objetos"), exist_ok=True)
+    os.makedirs(os.path.join(almacen, "plantillas"), exist_ok=True)
+
+    usados, tamano_plantillas = set(), 0
+    for fichero in sorted(os.listdir(plantillas)):
+        if not fichero.endswith(".docx"):
+            continue
+        ruta = os.path.join(plantillas, fichero)
+        tamano_plantillas += os.path.getsize(ruta)
+
+        miembros = []
+        with zipfile.ZipFile(ruta) as zf:
+            claves = _claves_fuentes(zf)
+            for info in zf.infolist():
+                datos = zf.read(info)
+                guid = claves.get(info.filename)
+                if guid:
+                    datos = ofuscar(datos, guid)  # se guarda la fuente en claro
+                digest = _guardar_objeto(almacen, datos)
+                usados.add(digest)
+                miembros.append({
+                    "nombre": info.filename,
+                    "sha256": digest,
+                    "fecha": list(info.date_time),
+                    "comprimido": info.compress_type != zipfile.ZIP_STORED,
+                    **({"clave_fuente": guid} if guid else {}),
+                })
+
+        with open(os.path.join(almacen, "plantillas", fichero + ".json"), "w", encoding="utf-8") as f:
+            json.dump({"plantilla": fichero, "miembros": miembros}, f, ensure_ascii=False, indent=1)
+
+    directorio_objetos = os.path.join(almacen, "objetos")
+    for digest in os.listdir(directorio_objetos):
+        if digest not in usados:
+            os.remove(os.path.join(directorio_objetos, digest))
+
+    tamano_almacen = sum(
+        os.path.getsize(os.path.join(raiz, f)) for raiz, _, ficheros in os.walk(almacen) for f in ficheros
+    )
+    return {"plantillas": tamano_plantillas, "almacen": tamano_almacen, "objetos": len(usados)}
+
+
+def reconstruir_plantilla(fichero: str, destino, almacen: str = DIRECTORIO_ALMACEN):
+    """Escribe en `destino` (ruta o fichero abierto) el .docx `fichero` a partir del almacén."""
+    with open(os.path.join(almacen, "plantillas", fichero + ".json"), encoding="utf-8") as f:
+        manifiesto = json.load(f)
+
+    with zipfile.ZipFile(destino, "w") as zf:
+        for miembro in manifiesto["miembros"]:
+            datos = _leer_objeto(almacen, miembro["sha256"])
+            if "clave_fuente" in miembro:
+                datos = ofuscar(datos, miembro["clave_fuente"])
+            info = zipfile.ZipInfo(miembro["nombre"], tuple(miembro["fecha"]))
+            info.compress_type = zipfile.ZIP_DEFLATED if miembro["comprimido"] else zipfile.ZIP_STORED
+            zf.writestr(info, datos)
+
+
+def asegurar_plantilla(fichero: str, plantillas: str = DIRECTORIO_PLANTILLAS, almacen: str = DIRECTORIO_ALMACEN) -> str:
+    """
+    Ruta del .docx `fichero`, reconstruyéndolo desde el almacén si no existe o
+    si su manifiesto es más reciente (p. ej. tras un git pull). Un .docx más
+    nuevo que el manifiesto (recién editado) se respeta hasta construir.
+    """
+    ruta = os.path.join(plantillas, fichero)
+    manifiesto = os.path.join(almacen, "plantillas", fichero + ".json")
+    try:
+        actualizado = os.path.getmtime(manifiesto)
+    except OSError:
+        return ruta  # plantilla que no está en el almacén: se usa tal cual
+
+    with _lock:
+        if not os.path.exists(ruta) or os.path.getmtime(ruta) < actualizado:
+            os.makedirs(plantillas, exist_ok=True)
+            reconstruir_plantilla(fichero, ruta + ".tmp", almacen)
+            os.replace(ruta + ".tmp", ruta)
+    return ruta
+
+
+def restaurar_plantillas(plantillas: str = DIRECTORIO_PLANTILLAS, almacen: str = DIRECTORIO_ALMACEN) -> list:
+    """Regenera en `plantillas` todos los .docx del almacén. Devuelve sus nombres."""
+    os.makedirs(plantillas, exist_ok=True)
+    ficheros = sorted(f[:-len(".json")] for f in os.listdir(os.path.join(almacen, "plantillas")))
+    for fichero in ficheros:
+        ruta = os.path.join(plantillas, fichero)
+        with _lock:
+            reconstruir_plantilla(fichero, ruta + ".tmp", almacen)
+            os.replace(ruta + ".tmp", ruta)
+    return ficheros
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Almacén deduplicado de las plantillas .docx")
+    parser.add_argument("accion", choices=["construir", "restaurar"])
+    parser.add_argument("--plantillas", default=DIRECTORIO_PLANTILLAS)
+    parser.add_argument("--almacen", default=DIRECTORIO_ALMACEN)
+    args = parser.parse_args()
+
+    if args.accion == "construir":
+        tamanos = construir_almacen(args.plantillas, args.almacen)
+        print(
+            f"{tamanos['plantillas'] / 1e6:.1f} MB de plantillas -> "
+            f"{tamanos['almacen'] / 1e6:.1f} MB en el almacén ({tamanos['objetos']} objetos)"
+        )
+    else:
+        for fichero in restaurar_plantillas(args.plantillas, args.almacen):
+            print(f"✅ {fichero}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Índice local (SQLite + FTS5) de los alumnos de todas las hojas del registro.
+
+Se reconstruye una sola vez por versión del Excel (hash del contenido), en
+segundo plano para no retrasar el primer pintado, y permite buscar al
+instante por DNI, Nº TITULO, promoción o prefijo del nombre/apellidos en
+todos los programas a la vez. También da la lista de alumnos de cada hoja
+(con su fila en el Excel) sin cargar la hoja en un DataFrame.
+"""
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+import pandas as pd
+import streamlit as st
+from hojas.utils.excel_utils import hash_archivo, leer_hoja, listar_hojas
+from hojas.utils.plantilla_utils import limpiar, limpiar_numero
+
+RUTA_INDICE = os.getenv("TITULOS_INDICE_DB", "indice_alumnos.sqlite3")
+LIMITE_RESULTADOS = 50
+COLUMNAS_INDICE = ("NOMBRE", "APELLIDOS", "DNI ALUMNO", "Nº TITULO")
+# Cambiar si cambia lo que se guarda en el índice (obliga a reconstruirlo)
+VERSION_INDICE = 3
+
+_lock = threading.Lock()
+_construcciones = {}  # (ruta del índice, versión) -> hilo que lo está construyendo
+_lock_construcciones = threading.Lock()
+
+
+@contextmanager
+def _conexion(ruta: str = None):
+    conexion = sqlite3.connect(ruta or RUTA_INDICE, timeout=30)
+    conexion.row_factory = sqlite3.Row
+    try:
+        with conexion:
+            yield conexion
+    finally:
+        conexion.close()
+
+
+def _crear_tablas(conexion):
+    conexion.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT);
+        CREATE TABLE IF NOT EXISTS alumnos (
+            id              INTEGER PRIMARY KEY,
+            hoja            TEXT NOT NULL,
+            fila            INTEGER NOT NULL,
+            nombre_completo TEXT NOT NULL,
+            dni             TEXT,
+            n_titulo        TEXT,
+            promocion       TEXT
+        );
+        CREATE INDEX IF NOT EXISTS ix_alumnos_hoja ON alumnos (hoja, id);
+        CREATE INDEX IF NOT EXISTS ix_alumnos_dni ON alumnos (dni);
+        CREATE INDEX IF NOT EXISTS ix_alumnos_titulo ON alumnos (n_titulo);
+        CREATE INDEX IF NOT EXISTS ix_alumnos_promocion ON alumnos (promocion);
+        CREATE VIRTUAL TABLE IF NOT EXISTS alumnos_fts USING fts5(
+            nombre_completo,
+            content='alumnos',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        );
+        """
+    )
+
+
+def _version(ruta_excel: str) -> str:
+    return f"{VERSION_INDICE}:{hash_archivo(ruta_excel)}"
+
+
+def _version_guardada(conexion):
+    fila = conexion.execute("SELECT valor FROM meta WHERE clave = 'hash'").fetchone()
+    return None if fila is None else fila["valor"]
+
+
+def _filas_del_registro(ruta_excel: str):
+    """(hoja, fila, nombre_completo, dni, n_titulo, promocion) de todas las hojas."""
+    # Cada hoja se lee de la instantánea, sin llenar la caché de cargar_hoja
+    for hoja in listar_hojas(ruta_excel):
+        df = leer_hoja(ruta_excel, hoja, columnas=(*COLUMNAS_INDICE, "PROMOCION EN LA QUE FINALIZA"))
+        if any(col not in df.columns for col in COLUMNAS_INDICE):
+            continue
+
+        df = df[~df["Nº TITULO"].isna() & ~df["DNI ALUMNO"].isna()]
+        promocion = df.get("PROMOCION EN LA QUE FINALIZA", pd.Series(index=df.index, dtype=object))
+        yield from zip(
+            [hoja] * len(df),
+            df.index.tolist(),
+            df["NOMBRE"].astype(str).str.strip() + " " + df["APELLIDOS"].astype(str).str.strip(),
+            df["DNI ALUMNO"].map(limpiar).str.upper(),
+            df["Nº TITULO"].map(limpiar_numero),
+            promocion.map(limpiar),
+        )
+
+
+def indice_al_dia(ruta_excel: str, ruta: str = None) -> bool:
+    with _conexion(ruta) as conexion:
+        _crear_tablas(conexion)
+        return _version_guardada(conexion) == _version(ruta_excel)
+
+
+def sincronizar_indice(ruta_excel: str, ruta: str = None) -> bool:
+    """
+    Reconstruye el índice si el Excel ha cambiado desde la última vez.
+    Devuelve True si se ha reconstruido.
+
+    Las hojas se leen antes de abrir la transacción de escritura: mientras
+    tanto las búsquedas siguen contestando con el índice anterior.
+    """
+    digest = _version(ruta_excel)
+
+    with _lock:
+        if indice_al_dia(ruta_excel, ruta):
+            return False
+        filas = list(_filas_del_registro(ruta_excel))
+
+        with _conexion(ruta) as conexion:
+            # Se rehacen las tablas por si el esquema es de una versión anterior
+            conexion.execute("DROP TABLE IF EXISTS alumnos_fts")
+            conexion.execute("DROP TABLE IF EXISTS alumnos")
+            _crear_tablas(conexion)
+            conexion.executemany(
+                "INSERT INTO alumnos (hoja, fila, nombre_completo, dni, n_titulo, promocion) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                filas,
+            )
+            conexion.execute("INSERT INTO alumnos_fts (alumnos_fts) VALUES ('rebuild')")
+            conexion.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES ('hash', ?)", (digest,))
+    return True
+
+
+def preparar_indice(ruta_excel: str, ruta: str = None):
+    """
+    Si el índice no corresponde a esta versión del Excel, empieza a
+    reconstruirlo en segundo plano y devuelve el hilo (None si ya está al día).
+    """
+    if indice_al_dia(ruta_excel, ruta):
+        return None
+
+    clave = (os.path.abspath(ruta or RUTA_INDICE), _version(ruta_excel))
+    with _lock_construcciones:
+        hilo = _construcciones.get(clave)
+        if hilo is None or not hilo.is_alive():
+            hilo = threading.Thread(target=sincronizar_indice, args=(ruta_excel, ruta), daemon=True)
+            _construcciones[clave] = hilo
+            hilo.start()
+    return hilo
+
+
+def alumnos_de_hoja(ruta_excel: str, hoja: str, ruta: str = None):
+    """
+    [{"nombre_completo", "dni", "fila"}] de la hoja en el orden del Excel, o
+    None si el índice aún no corresponde a esta versión del Excel.
+    """
+    with _conexion(ruta) as conexion:
+        _crear_tablas(conexion)
+        if _version_guardada(conexion) != _version(ruta_excel):
+            return None
+        filas = conexion.execute(
+            "SELECT nombre_completo, dni, fila FROM alumnos WHERE hoja = ? ORDER BY id", (hoja,)
+        ).fetchall()
+    return [dict(f) for f in filas]
+
+
+def buscar_alumnos(consulta: str, limite: int = LIMITE_RESULTADOS, ruta: str = None) -> list:
+    """
+    Busca por DNI, Nº TITULO o promoción exactos y por prefijo de nombre y
+    apellidos (sin distinguir mayúsculas ni tildes). Devuelve una lista de dicts.
+    """
+    consulta = (consulta or "").strip()
+    if not consulta:
+        return []
+
+    sql = """
+        SELECT hoja, nombre_completo, dni, n_titulo, promocion FROM alumnos
+        WHERE dni = ? OR n_titulo = ? OR promocion = ?
+    """
+    # Nº TITULO numéricos se indexan sin decimales ("101", no "101.0")
+    titulo = re.sub(r"^(\d+)\.0+$", r"\1", consulta)
+    parametros = [consulta.upper(), titulo, consulta]
+
+    # Prefijo de cada palabra: "ana per" -> "ana"* AND "per"*
+    palabras = re.findall(r"\w+", consulta)
+    if palabras:
+        sql += """
+            UNION
+            SELECT a.hoja, a.nombre_completo, a.dni, a.n_titulo, a.promocion
+            FROM alumnos_fts JOIN alumnos a ON a.id = alumnos_fts.rowid
+            WHERE alumnos_fts MATCH ?
+        """
+        parametros.append(" AND ".join(f'"{p}"*' for p in palabras))
+
+    with _conexion(ruta) as conexion:
+        _crear_tablas(conexion)
+        filas = conexion.execute(sql + " LIMIT ?", (*parametros, limite)).fetchall()
+    return [dict(f) for f in filas]
+
+
+def _ir_a_alumno(hoja: str, dni: str):
+    st.session_state["hoja_seleccionada"] = hoja
+    st.session_state["dni_buscado"] = dni
+
+
+def seleccionar_alumno(opciones, clave: str, nombre_por_dni=None):
+    """
+    st.selectbox de alumnos que respeta el alumno elegido desde el buscador.
+    nombre_por_dni(dni) traduce el DNI buscado a una de las opciones.
+    """
+    dni = st.session_state.pop("dni_buscado", None)
+    if dni is not None and nombre_por_dni is not None:
+        buscado = nombre_por_dni(dni)
+        if buscado is not None:
+            st.session_state[clave] = buscado
+    return st.selectbox("Selecciona un alumno", opciones, key=clave)
+
+
+def mostrar_buscador(ruta_excel: str):
+    """Caja de búsqueda de alumnos en todas las hojas del registro."""
+    construccion = preparar_indice(ruta_excel)
+
+    consulta = st.text_input("🔎 Buscar alumno en todas las hojas (DNI, nombre, Nº título o promoción)")
+    if not consulta:
+        return
+
+    if construccion is not None:
+        # Solo se espera al índice nuevo cuando de verdad se busca algo
+        with st.spinner("Preparando el índice de alumnos..."):
+            construccion.join()
+
+    resultados = buscar_alumnos(consulta)
+    if not resultados:
+        st.info("No se ha encontrado ningún alumno.")
+        return
+
+    st.dataframe(pd.DataFrame(resultados), hide_index=True)
+
+    etiquetas = [f"{r['nombre_completo']} · {r['hoja']} · {r['n_titulo']}" for r in resultados]
+    elegido = st.selectbox("Ir al alumno", range(len(resultados)), format_func=etiquetas.__getitem__)
+    st.button(
+        "➡️ Abrir",
+        on_click=_ir_a_alumno,
+        args=(resultados[elegido]["hoja"], resultados[elegido]["dni"]),
+    )
@@ -0,0 +1,276 @@
+"""
+Conversión DOCX → PDF con una suite ofimática local (LibreOffice) en modo headless.
+
+Se mantiene un pequeño grupo de workers de larga duración alimentados por una
+cola de trabajos. Si está instalado ``unoserver`` cada worker arranca una
+instancia de LibreOffice persistente y convierte con ``unoconvert``; si no,
+cada worker lanza ``soffice --convert-to pdf`` por lotes de varios ficheros
+con su propio perfil de usuario, que queda caliente entre lotes.
+"""
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+
+CONVERSORES_POR_DEFECTO = int(os.getenv("TITULOS_CONVERSORES", "2"))
+MAX_FICHEROS_POR_LOTE = 20
+TIEMPO_MAXIMO_S = 120
+# Lo más que se espera por cada PDF pedido (cola + un lote completo, con margen)
+TIEMPO_ESPERA_S = 2 * (TIEMPO_MAXIMO_S + 10 * MAX_FICHEROS_POR_LOTE)
+TIEMPO_ARRANQUE_S = int(os.getenv("TITULOS_ARRANQUE_UNOSERVER_S", "60"))
+
+_conversor = None
+_conversor_lock = threading.Lock()
+
+
+def _ejecutable_office():
+    return shutil.which("soffice") or shutil.which("libreoffice")
+
+
+def conversion_disponible() -> bool:
+    return bool(_ejecutable_office() or shutil.which("unoconvert"))
+
+
+def _puerto_libre() -> int:
+    """Puerto TCP local que nadie está usando ahora mismo (lo elige el sistema)."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _Trabajo:
+    def __init__(self, docx_path: str):
+        self.docx_path = docx_path
+        self.pdf_path = os.path.splitext(docx_path)[0] + ".pdf"
+        self.futuro = Future()
+        self.encolado = time.perf_counter()
+
+
+class _Worker(threading.Thread):
+    def __init__(self, conversor, numero: int):
+        super().__init__(daemon=True, name=f"conversor-pdf-{numero}")
+        self.conversor = conversor
+        self.numero = numero
+        self.perfil = tempfile.mkdtemp(prefix=f"titulos_lo_perfil_{numero}_")
+        self.servidor = None
+        # Puertos libres y no fijos: con uno fijo podría contestar otro proceso
+        self.puerto = _puerto_libre()
+        self.puerto_uno = _puerto_libre()
+
+    def _arrancar_servidor(self):
+        if not shutil.which("unoserver") or not shutil.which("unoconvert"):
+            return
+        self.servidor = subprocess.Popen(
+            [
+                "unoserver",
+                "--interface", "127.0.0.1",
+                "--port", str(self.puerto),
+                "--uno-port", str(self.puerto_uno),
+                f"-env:UserInstallation=file://{self.perfil}",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        if not self._esperar_servidor():
+            # No ha llegado a escuchar: se convierte con soffice por lotes
+            self.servidor.kill()
+            self.servidor.wait()
+            self.servidor = None
+
+    def _esperar_servidor(self) -> bool:
+        """Espera a que unoserver acepte conexiones en su puerto (o muera, o se agote el tiempo)."""
+        limite = time.monotonic() + TIEMPO_ARRANQUE_S
+        while time.monotonic() < limite:
+            if self.servidor.poll() is not None:
+                return False
+            try:
+                with socket.create_connection(("127.0.0.1", self.puerto), timeout=1):
+                    return True
+            except OSError:
+                time.sleep(0.2)
+        return False
+
+    def _convertir_con_unoserver(self, lote):
+        for trabajo in lote:
+            subprocess.run(
+                ["unoconvert", "--port", str(self.puerto), "--convert-to", "pdf",
+                 trabajo.docx_path, trabajo.pdf_path],
+                check=True,
+                capture_output=True,
+                timeout=TIEMPO_MAXIMO_S,
+            )
+
+    def _convertir_con_soffice(self, lote):
+        # Nombres únicos dentro del lote para que no se pisen las salidas
+        with tempfile.TemporaryDirectory(prefix="titulos_lote_") as directorio:
+            entradas = []
+            for n, trabajo in enumerate(lote):
+                entrada = os.path.join(directorio, f"{n}.docx")
+                shutil.copyfile(trabajo.docx_path, entrada)
+                entradas.append(entrada)
+
+            subprocess.run(
+                [
+                    _ejecutable_office(),
+                    f"-env:UserInstallation=file://{self.perfil}",
+                    "--headless", "--norestore",
+                    "--convert-to", "pdf",
+                    "--outdir", directorio,
+                    *entradas,
+                ],
+                check=True,
+                capture_output=True,
+                timeout=TIEMPO_MAXIMO_S + 10 * len(lote),
+            )
+
+            for n, trabajo in enumerate(lote):
+                shutil.move(os.path.join(directorio, f"{n}.pdf"), trabajo.pdf_path)
+
+    def run(self):
+        try:
+            self._arrancar_servidor()
+        except OSError:
+            self.servidor = None  # unoserver no arranca: soffice por lotes
+
+        try:
+            self._atender_cola()
+        except Exception as e:
+            # Sin este worker los trabajos en cola podrían quedarse esperando para siempre
+            self.conversor._fallar_pendientes(e)
+        finally:
+            if self.servidor is not None:
+                self.servidor.terminate()
+            shutil.rmtree(self.perfil, ignore_errors=True)
+
+    def _atender_cola(self):
+        cola = self.conversor.cola
+
+        while True:
+            trabajo = cola.get()
+            if trabajo is None:
+                break
+
+            # Agrupar lo que ya esté esperando en la cola
+            lote = [trabajo]
+            while len(lote) < self.conversor.max_lote:
+                try:
+                    siguiente = cola.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    cola.put(None)
+                    break
+                lote.append(siguiente)
+
+            try:
+                if self.servidor is not None:
+                    self._convertir_con_unoserver(lote)
+                else:
+                    self._convertir_con_soffice(lote)
+                for t in lote:
+                    self.conversor._registrar(time.perf_counter() - t.encolado)
+                    t.futuro.set_result(t.pdf_path)
+            except Exception as e:
+                for t in lote:
+                    t.futuro.set_exception(e)
+
+
+class ConversorPDF:
+    """Grupo de conversores DOCX → PDF con cola de trabajos compartida."""
+
+    def __init__(self, workers: int = CONVERSORES_POR_DEFECTO, max_lote: int = MAX_FICHEROS_POR_LOTE):
+        if not conversion_disponible():
+            raise RuntimeError("No se ha encontrado LibreOffice (soffice) para convertir a PDF.")
+
+        self.cola = queue.Queue()
+        self.max_lote = max_lote
+        self._stats_lock = threading.Lock()
+        self._latencias = []
+        self._trabajos = 0
+        self._workers = [_Worker(self, n) for n in range(max(workers, 1))]
+        for worker in self._workers:
+            worker.start()
+
+    def _registrar(self, latencia: float):
+        with self._stats_lock:
+            self._trabajos += 1
+            self._latencias.append(latencia)
+            del self._latencias[:-1000]  # solo las últimas 1000
+
+    def _fallar_pendientes(self, error: Exception):
+        """Falla los trabajos que siguen en la cola (deja en ella los avisos de cierre)."""
+        cierres = 0
+        while True:
+            try:
+                trabajo = self.cola.get_nowait()
+            except queue.Empty:
+                break
+            if trabajo is None:
+                cierres += 1
+            elif not trabajo.futuro.done():
+                trabajo.futuro.set_exception(error)
+        for _ in range(cierres):
+            self.cola.put(None)
+
+    def convertir(self, docx_path: str) -> Future:
+        """Encola la conversión; el Future devuelve la ruta del PDF generado."""
+        trabajo = _Trabajo(docx_path)
+        self.cola.put(trabajo)
+        return trabajo.futuro
+
+    def convertir_lote(self, docx_paths) -> list:
+        futuros = [self.convertir(ruta) for ruta in docx_paths]
+        return [f.result(timeout=TIEMPO_ESPERA_S) for f in futuros]
+
+    def profundidad_cola(self) -> int:
+        return self.cola.qsize()
+
+    def estadisticas(self) -> dict:
+        with self._stats_lock:
+            latencias = list(self._latencias)
+            trabajos = self._trabajos
+        return {
+            "cola": self.profundidad_cola(),
+            "trabajos": trabajos,
+            "latencia_media_s": sum(latencias) / len(latencias) if latencias else 0.0,
+            "latencia_max_s": max(latencias, default=0.0),
+        }
+
+    def cerrar(self):
+        for _ in self._workers:
+            self.cola.put(None)
+        for worker in self._workers:
+            worker.join()
+
+
+def obtener_conversor() -> ConversorPDF:
+    """Conversor compartido por todo el proceso (se crea la primera vez que se pide)."""
+    global _conversor
+    with _conversor_lock:
+        if _conversor is None:
+            _conversor = ConversorPDF()
+        return _conversor
+
+
+def convertir_documentos(documentos):
+    """
+    Recibe (nombre_fichero, bytes .docx) y devuelve (nombre_fichero.pdf, bytes)
+    convirtiendo todo el lote a través del conversor compartido.
+    """
+    conversor = obtener_conversor()
+    with tempfile.TemporaryDirectory(prefix="titulos_pdf_") as directorio:
+        pendientes = []
+        for n, (nombre, datos) in enumerate(documentos):
+            ruta = os.path.join(directorio, f"{n}.docx")
+            with open(ruta, "wb") as f:
+                f.write(datos)
+            pendientes.append((os.path.splitext(nombre)[0] + ".pdf", conversor.convertir(ruta)))
+
+        for nombre, futuro in pendientes:
+            with open(futuro.result(timeout=TIEMPO_ESPERA_S), "rb") as f:
+                yield nombre, f.read()
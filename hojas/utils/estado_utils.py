@@ -0,0 +1,160 @@
+"""
+Estado local (SQLite) de los títulos ya emitidos.
+
+Por cada (hoja, Nº TITULO) se guarda una huella del contenido con el que se
+emitió, de modo que al volver a abrir el registro solo aparecen como
+pendientes las filas nuevas o las que han cambiado desde la última emisión.
+Los Nº TITULO solo son únicos dentro de cada programa, de ahí la hoja en la
+clave. Un título cuenta como emitido cuando se descarga, no cuando se genera.
+"""
+import datetime
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+import pandas as pd
+from hojas.registro import REGISTRO
+from hojas.utils.plantilla_utils import construir_campos, limpiar, limpiar_numero
+
+RUTA_ESTADO = os.getenv("TITULOS_ESTADO_DB", "estado_titulos.sqlite3")
+
+NUEVO = "nuevo"
+MODIFICADO = "modificado"
+EMITIDO = "emitido"
+
+# PRAGMA user_version: 1 = Nº TITULO guardados sin ".0" (limpiar_numero)
+VERSION_ESQUEMA = 1
+
+
+def _hoja_de_plantilla(plantilla: str) -> str:
+    """Hoja del registro que usa la plantilla (cada plantilla pertenece a una sola hoja)."""
+    for hoja, entrada in REGISTRO.items():
+        if any(fichero == plantilla for fichero, _ in entrada["plantillas"].values()):
+            return hoja
+    return ""
+
+
+def _sin_decimales(n_titulo: str) -> str:
+    """'100.0' -> '100': Nº TITULO guardados cuando la columna se leía como float."""
+    m = re.fullmatch(r"(\d+)\.0+", n_titulo)
+    return m.group(1) if m else n_titulo
+
+
+def _conectar(ruta: str = None) -> sqlite3.Connection:
+    conexion = sqlite3.connect(ruta or RUTA_ESTADO, timeout=30)
+    conexion.execute("PRAGMA journal_mode=WAL")
+
+    # Bases antiguas con clave solo por Nº TITULO: se migran deduciendo la hoja de la plantilla
+    columnas = [c[1] for c in conexion.execute("PRAGMA table_info(emitidos)")]
+    migrar = bool(columnas) and "hoja" not in columnas
+    with conexion:
+        if migrar:
+            conexion.execute("ALTER TABLE emitidos RENAME TO emitidos_sin_hoja")
+        conexion.execute(
+            """
+            CREATE TABLE IF NOT EXISTS emitidos (
+                hoja      TEXT NOT NULL,
+                n_titulo  TEXT NOT NULL,
+                huella    TEXT NOT NULL,
+                dni       TEXT,
+                plantilla TEXT,
+                emitido   TEXT NOT NULL,
+                PRIMARY KEY (hoja, n_titulo)
+            )
+            """
+        )
+        if migrar:
+            conexion.create_function("hoja_de_plantilla", 1, _hoja_de_plantilla)
+            conexion.execute(
+                """
+                INSERT OR REPLACE INTO emitidos (hoja, n_titulo, huella, dni, plantilla, emitido)
+                SELECT hoja_de_plantilla(plantilla), n_titulo, huella, dni, plantilla, emitido
+                FROM emitidos_sin_hoja
+                """
+            )
+            conexion.execute("DROP TABLE emitidos_sin_hoja")
+
+        if conexion.execute("PRAGMA user_version").fetchone()[0] < VERSION_ESQUEMA:
+            conexion.create_function("sin_decimales", 1, _sin_decimales)
+            conexion.execute(
+                "UPDATE OR REPLACE emitidos SET n_titulo = sin_decimales(n_titulo) WHERE n_titulo LIKE '%.0%'"
+            )
+            conexion.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+    return conexion
+
+
+@contextmanager
+def _conexion(ruta: str = None):
+    """Conexión con transacción (commit al salir sin errores) que siempre se cierra."""
+    conexion = _conectar(ruta)
+    try:
+        with conexion:
+            yield conexion
+    finally:
+        conexion.close()
+
+
+def huella_alumno(alumno) -> str:
+    """Huella de los datos que aparecen en el título (lo que importa para reemitirlo)."""
+    campos = construir_campos(alumno)
+    return hashlib.sha256(json.dumps(campos, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def estado_filas(df: pd.DataFrame, hoja: str, ruta: str = None) -> pd.Series:
+    """Estado de cada fila de la hoja: 'nuevo', 'modificado' o 'emitido'."""
+    with _conexion(ruta) as conexion:
+        emitidos = dict(conexion.execute("SELECT n_titulo, huella FROM emitidos WHERE hoja = ?", (hoja,)))
+
+    estados = []
+    for alumno in df.to_dict("records"):
+        huella = emitidos.get(limpiar_numero(alumno.get("Nº TITULO")))
+        if huella is None:
+            estados.append(NUEVO)
+        elif huella != huella_alumno(alumno):
+            estados.append(MODIFICADO)
+        else:
+            estados.append(EMITIDO)
+    return pd.Series(estados, index=df.index, dtype=object)
+
+
+def filtrar_pendientes(df: pd.DataFrame, hoja: str, ruta: str = None) -> pd.DataFrame:
+    """Solo las filas nuevas o modificadas desde su última emisión."""
+    if df.empty:
+        return df
+    return df[estado_filas(df, hoja, ruta) != EMITIDO]
+
+
+def marcar_emitidos(alumnos, hoja: str, plantilla_path: str = "", ruta: str = None) -> int:
+    """
+    Registra los alumnos de la hoja como emitidos con su huella actual.
+    Se llama desde el on_click de los botones de descarga, una vez entregado el título.
+    """
+    ahora = datetime.datetime.now().isoformat(timespec="seconds")
+    plantilla = os.path.basename(plantilla_path)
+    filas = [
+        (
+            hoja,
+            limpiar_numero(a.get("Nº TITULO")),
+            huella_alumno(a),
+            limpiar(a.get("DNI ALUMNO")),
+            plantilla,
+            ahora,
+        )
+        for a in alumnos
+    ]
+    with _conexion(ruta) as conexion:
+        conexion.executemany(
+            """
+            INSERT INTO emitidos (hoja, n_titulo, huella, dni, plantilla, emitido)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(hoja, n_titulo) DO UPDATE SET
+                huella = excluded.huella,
+                dni = excluded.dni,
+                plantilla = excluded.plantilla,
+                emitido = excluded.emitido
+            """,
+            filas,
+        )
+    return len(filas)
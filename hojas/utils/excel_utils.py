@@ -0,0 +1,275 @@
+"""
+Carga del Excel del registro de títulos.
+
+Los nombres de las hojas se leen sin parsear los datos y cada hoja se parsea
+solo cuando se pide. Las hojas ya parseadas se guardan en memoria (compartida
+por todas las sesiones del proceso) con clave = hash del contenido del
+archivo, así que un Excel que no ha cambiado nunca se vuelve a parsear.
+
+Si pyarrow está instalado, cada versión del Excel se convierte una sola vez
+en una instantánea columnar (un .feather por hoja, columnas normalizadas y
+fechas tipadas) que luego se lee con memory mapping en milisegundos.
+"""
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+try:
+    from pyarrow import feather
+except ImportError:  # sin pyarrow se lee siempre del Excel
+    feather = None
+
+FILA_CABECERA = 2
+MAX_HOJAS_EN_CACHE = 32
+DIRECTORIO_SNAPSHOTS = os.getenv("TITULOS_SNAPSHOTS", ".snapshots_registro")
+MANIFIESTO = "manifiesto.json"
+
+_lock = threading.Lock()
+_snapshot_lock = threading.Lock()
+_hashes = {}                 # (ruta, mtime_ns, tamaño) -> sha256
+_nombres_hojas = {}          # sha256 -> [nombres]
+_hojas = OrderedDict()       # (sha256, hoja) -> DataFrame
+_stats = {"aciertos": 0, "fallos": 0}
+
+
+def hash_archivo(ruta: str) -> str:
+    """SHA-256 del contenido; solo se recalcula si cambia la fecha o el tamaño del fichero."""
+    info = os.stat(ruta)
+    clave = (os.path.abspath(ruta), info.st_mtime_ns, info.st_size)
+    with _lock:
+        if clave in _hashes:
+            return _hashes[clave]
+
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for trozo in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(trozo)
+    digest = sha.hexdigest()
+
+    with _lock:
+        _hashes[clave] = digest
+    return digest
+
+
+def _normalizar_columnas(df: pd.DataFrame) -> pd.DataFrame:
+    """Nombres de columna como texto sin espacios sobrantes y sin repetidos."""
+    nombres, vistos = [], {}
+    for col in df.columns:
+        nombre = str(col).strip()
+        if nombre in vistos:
+            vistos[nombre] += 1
+            nombre = f"{nombre}.{vistos[nombre]}"
+        else:
+            vistos[nombre] = 0
+        nombres.append(nombre)
+    df.columns = nombres
+    return df
+
+
+def _normalizar_tipos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Deja cada columna en un tipo que Arrow pueda guardar: las columnas de fechas
+    se tipan como datetime si todas sus celdas lo son y el resto de columnas
+    mixtas pasan a texto (conservando los vacíos).
+    """
+    for col in df.columns:
+        serie = df[col]
+        if serie.dtype != object:
+            continue
+
+        no_nulos = serie.dropna()
+        if not no_nulos.empty and no_nulos.map(lambda v: isinstance(v, datetime.date)).all():
+            try:
+                df[col] = pd.to_datetime(serie)
+                continue
+            except (ValueError, TypeError):
+                pass
+
+        df[col] = serie.where(serie.isna(), serie.astype(str))
+    return df
+
+
+def _directorio_snapshot(digest: str) -> str:
+    return os.path.join(DIRECTORIO_SNAPSHOTS, digest)
+
+
+def sincronizar_snapshot(ruta: str):
+    """
+    Crea (si no existe ya) la instantánea columnar de esta versión del Excel y
+    devuelve su manifiesto {hoja: fichero .feather}. Devuelve None sin pyarrow.
+    """
+    if feather is None:
+        return None
+
+    digest = hash_archivo(ruta)
+    with _snapshot_lock:
+        return _crear_snapshot(ruta, digest)
+
+
+def _crear_snapshot(ruta: str, digest: str) -> dict:
+    directorio = _directorio_snapshot(digest)
+    manifiesto_path = os.path.join(directorio, MANIFIESTO)
+
+    if os.path.exists(manifiesto_path):
+        with open(manifiesto_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    temporal = directorio + ".tmp"
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+
+    manifiesto = {}
+    todas = pd.read_excel(ruta, sheet_name=None, header=FILA_CABECERA)
+    for n, (hoja, df) in enumerate(todas.items()):
+        df = _normalizar_tipos(_normalizar_columnas(df))
+        fichero = f"{n}.feather"
+        # Sin compresión para poder leerlo con memory mapping
+        feather.write_feather(df, os.path.join(temporal, fichero), compression="uncompressed")
+        manifiesto[hoja] = fichero
+
+    with open(os.path.join(temporal, MANIFIESTO), "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False)
+
+    # Publicar la instantánea de golpe y borrar las de versiones anteriores
+    shutil.rmtree(directorio, ignore_errors=True)
+    os.replace(temporal, directorio)
+    for otro in os.listdir(DIRECTORIO_SNAPSHOTS):
+        if otro != digest:
+            shutil.rmtree(os.path.join(DIRECTORIO_SNAPSHOTS, otro), ignore_errors=True)
+
+    return manifiesto
+
+
+def listar_hojas(ruta: str) -> list:
+    """
+    Nombres de las hojas del libro (solo lee el índice del libro, no los datos).
+    La instantánea de esta versión del Excel, si falta, se empieza a crear en
+    segundo plano para que la primera hoja que se pida ya la encuentre hecha.
+    """
+    digest = hash_archivo(ruta)
+    with _lock:
+        if digest in _nombres_hojas:
+            return list(_nombres_hojas[digest])
+
+    if feather is not None:
+        threading.Thread(target=sincronizar_snapshot, args=(ruta,), daemon=True).start()
+
+    from openpyxl import load_workbook
+
+    libro = load_workbook(ruta, read_only=True)
+    try:
+        nombres = list(libro.sheetnames)
+    finally:
+        libro.close()
+
+    with _lock:
+        _nombres_hojas[digest] = nombres
+    return list(nombres)
+
+
+def leer_hoja(ruta: str, hoja: str, header: int = FILA_CABECERA, columnas=None) -> pd.DataFrame:
+    """
+    Lee una hoja (de la instantánea si la hay) sin pasar por la caché en
+    memoria de cargar_hoja: para recorridos de todas las hojas, como el índice
+    del buscador, que no deben desplazar de la caché las hojas en uso.
+    Con `columnas` solo se leen esas (las que existan).
+    """
+    manifiesto = sincronizar_snapshot(ruta) if header == FILA_CABECERA else None
+    if manifiesto is not None and hoja in manifiesto:
+        fichero = os.path.join(_directorio_snapshot(hash_archivo(ruta)), manifiesto[hoja])
+        tabla = feather.read_table(fichero, memory_map=True)
+        if columnas is not None:
+            tabla = tabla.select([c for c in tabla.column_names if c in columnas])
+        return tabla.to_pandas()
+
+    usecols = None if columnas is None else (lambda c: str(c).strip() in columnas)
+    df = pd.read_excel(ruta, sheet_name=hoja, header=header, usecols=usecols)
+    return df if columnas is None else _normalizar_columnas(df)
+
+
+def leer_fila(ruta: str, hoja: str, fila: int) -> pd.Series:
+    """
+    Una sola fila (posición dentro de la hoja leída con pandas). Con la
+    instantánea solo se convierte esa fila; sin ella se carga la hoja entera.
+    """
+    manifiesto = sincronizar_snapshot(ruta)
+    if manifiesto is not None and hoja in manifiesto:
+        fichero = os.path.join(_directorio_snapshot(hash_archivo(ruta)), manifiesto[hoja])
+        tabla = feather.read_table(fichero, memory_map=True)
+        return tabla.slice(fila, 1).to_pandas().iloc[0]
+    return cargar_hoja(ruta, hoja).iloc[fila]
+
+
+def cargar_hoja(ruta: str, hoja: str, header: int = FILA_CABECERA) -> pd.DataFrame:
+    """
+    DataFrame de una sola hoja. El resultado está compartido entre llamadas:
+    quien lo vaya a modificar debe hacer antes df.copy().
+    """
+    clave = (hash_archivo(ruta), hoja, header)
+    with _lock:
+        df = _hojas.get(clave)
+        if df is not None:
+            _hojas.move_to_end(clave)
+            _stats["aciertos"] += 1
+            return df
+
+    df = leer_hoja(ruta, hoja, header)
+
+    with _lock:
+        _stats["fallos"] += 1
+        _hojas[clave] = df
+        while len(_hojas) > MAX_HOJAS_EN_CACHE:
+            _hojas.popitem(last=False)
+    return df
+
+
+def estadisticas_cache_hojas() -> dict:
+    with _lock:
+        return {**_stats, "hojas": len(_hojas)}
+
+
+def iterar_alumnos(ruta: str, hoja: str, header: int = FILA_CABECERA):
+    """
+    Recorre una hoja fila a fila con openpyxl en modo solo lectura y devuelve
+    un dict por alumno válido, sin cargar la hoja entera en memoria.
+
+    Aplica la misma limpieza que las hojas de expedición: nombres de columna
+    sin espacios, FECHA a partir de FECHA EXPEDICIÓN si no existe, se saltan
+    las filas vacías y las que no tienen Nº TITULO o DNI ALUMNO.
+    """
+    from openpyxl import load_workbook
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = libro[hoja].iter_rows(values_only=True)
+
+        for _ in range(header):
+            next(filas, None)
+        cabecera = next(filas, None)
+        if cabecera is None:
+            return
+
+        columnas = [
+            str(c).strip() if c is not None else f"Unnamed: {i}"
+            for i, c in enumerate(cabecera)
+        ]
+        copiar_fecha = "FECHA" not in columnas and "FECHA EXPEDICIÓN" in columnas
+
+        for fila in filas:
+            if all(v is None for v in fila):
+                continue
+
+            alumno = dict(zip(columnas, fila))
+            if copiar_fecha:
+                alumno["FECHA"] = alumno["FECHA EXPEDICIÓN"]
+            if alumno.get("Nº TITULO") is None or alumno.get("DNI ALUMNO") is None:
+                continue
+
+            yield alumno
+    finally:
+        libro.close()
@@ -0,0 +1,137 @@
+"""
+Normalización de las fechas del registro (FECHA y FECHA EXPEDICIÓN).
+
+Las celdas pueden venir como fecha de Excel, como número de serie o como texto
+escrito a mano. El texto se interpreta siempre con el día primero
+(07/05/2024 = 7 de mayo) y los formatos admitidos son explícitos, de modo que
+el mismo valor da siempre la misma fecha, se parsee la hoja entera
+(normalizar_fechas) o un solo alumno (formatear_fecha).
+
+Un texto que es solo un número ("45000") se trata como número de serie: es
+lo que queda de una fecha de Excel en una columna mixta de la instantánea.
+"""
+import datetime
+import numbers
+import re
+import pandas as pd
+
+FORMATO_TITULO = "%d/%m/%Y"
+COLUMNAS_FECHA = ("FECHA", "FECHA EXPEDICIÓN")
+
+# Formatos de texto admitidos, en orden de preferencia (día primero)
+FORMATOS_TEXTO = (
+    "%d/%m/%Y",
+    "%d-%m-%Y",
+    "%d.%m.%Y",
+    "%d/%m/%y",
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",  # fechas de Excel guardadas como texto en la instantánea
+)
+
+# Números de serie de Excel razonables (1927-2173) y su origen
+SERIE_MIN, SERIE_MAX = 10000, 100000
+ORIGEN_EXCEL = pd.Timestamp("1899-12-30")
+SERIE_TEXTO = re.compile(r"\d+(?:\.\d+)?")
+
+
+def columna_texto(columna: str) -> str:
+    """Nombre de la columna con la fecha ya formateada (p. ej. FECHA_TXT)."""
+    return f"{columna}_TXT"
+
+
+def _es_numero(valor) -> bool:
+    return isinstance(valor, numbers.Real) and not isinstance(valor, bool)
+
+
+def _vacio(valor) -> bool:
+    return valor is None or (not isinstance(valor, str) and pd.isna(valor)) or str(valor).strip() == ""
+
+
+def parsear_fecha(valor):
+    """Fecha (Timestamp) de una celda, o None si está vacía o no se entiende."""
+    if _vacio(valor):
+        return None
+    if isinstance(valor, (datetime.date, pd.Timestamp)):
+        return pd.Timestamp(valor)
+    if _es_numero(valor):
+        if SERIE_MIN <= valor <= SERIE_MAX:
+            return ORIGEN_EXCEL + pd.Timedelta(days=float(valor))
+        return None
+
+    texto = str(valor).strip()
+    if SERIE_TEXTO.fullmatch(texto):
+        return parsear_fecha(float(texto))
+    for formato in FORMATOS_TEXTO:
+        try:
+            return pd.Timestamp(datetime.datetime.strptime(texto, formato))
+        except ValueError:
+            continue
+    return None
+
+
+def formatear_fecha(valor) -> str:
+    """dd/mm/aaaa de una sola celda ("" si está vacía o no se entiende)."""
+    fecha = parsear_fecha(valor)
+    return "" if fecha is None else fecha.strftime(FORMATO_TITULO)
+
+
+def parsear_fechas(serie: pd.Series) -> pd.Series:
+    """Versión vectorizada de parsear_fecha: Series datetime64 con NaT donde no hay fecha."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+
+    fechas = pd.Series(pd.NaT, index=serie.index, dtype="datetime64[ns]")
+
+    # Fechas de Excel y números de serie
+    es_fecha = serie.map(lambda v: isinstance(v, (datetime.date, pd.Timestamp)))
+    if es_fecha.any():
+        fechas[es_fecha] = pd.to_datetime(serie[es_fecha])
+
+    es_numero = serie.map(_es_numero) & serie.notna()
+    if es_numero.any():
+        numeros = pd.to_numeric(serie[es_numero], errors="coerce")
+        numeros = numeros[(numeros >= SERIE_MIN) & (numeros <= SERIE_MAX)]
+        fechas[numeros.index] = ORIGEN_EXCEL + pd.to_timedelta(numeros, unit="D")
+
+    # Texto: cada formato explícito sobre lo que aún no se ha reconocido
+    textos = serie[~es_fecha & ~es_numero & serie.notna()].astype(str).str.strip()
+
+    # Números de serie guardados como texto
+    es_serie = textos.str.fullmatch(SERIE_TEXTO.pattern)
+    if es_serie.any():
+        numeros = pd.to_numeric(textos[es_serie])
+        numeros = numeros[(numeros >= SERIE_MIN) & (numeros <= SERIE_MAX)]
+        fechas[numeros.index] = ORIGEN_EXCEL + pd.to_timedelta(numeros, unit="D")
+        textos = textos[~es_serie]
+
+    for formato in FORMATOS_TEXTO:
+        textos = textos[textos != ""]
+        if textos.empty:
+            break
+        parseadas = pd.to_datetime(textos, format=formato, errors="coerce")
+        reconocidas = parseadas.notna()
+        fechas[parseadas.index[reconocidas]] = parseadas[reconocidas]
+        textos = textos[~reconocidas]
+
+    return fechas
+
+
+def normalizar_fechas(df: pd.DataFrame, columnas=COLUMNAS_FECHA) -> pd.DataFrame:
+    """
+    Añade al DataFrame una columna <COLUMNA>_TXT con cada fecha ya formateada
+    y devuelve el informe de celdas no vacías que no se han podido interpretar
+    (fila, columna, valor).
+    """
+    informe = []
+    for columna in columnas:
+        if columna not in df.columns:
+            continue
+        serie = df[columna]
+        fechas = parsear_fechas(serie)
+        df[columna_texto(columna)] = fechas.dt.strftime(FORMATO_TITULO).fillna("")
+
+        no_vacias = serie.notna() & (serie.astype(str).str.strip() != "")
+        for fila in serie.index[no_vacias & fechas.isna()]:
+            informe.append({"fila": fila, "columna": columna, "valor": str(serie[fila])})
+
+    return pd.DataFrame(informe, columns=["fila", "columna", "valor"])
@@ -0,0 +1,339 @@
+import csv
+import hashlib
+import io
+import os
+import re
+import tempfile
+import zipfile
+from collections import deque
+import streamlit as st
+import pandas as pd
+from hojas.utils.estado_utils import EMITIDO, MODIFICADO, NUEVO, estado_filas, marcar_emitidos
+from hojas.utils.excel_utils import iterar_alumnos
+from hojas.utils.fecha_utils import parsear_fecha, parsear_fechas
+from hojas.utils.metricas_utils import contar, medir
+from hojas.utils.conversion_utils import conversion_disponible, convertir_documentos, obtener_conversor
+from hojas.utils.paralelo_utils import WORKERS_POR_DEFECTO, generar_documentos_en_paralelo
+from hojas.utils.plantilla_utils import limpiar_numero
+
+MANIFIESTO_LOTE = "MANIFIESTO.csv"
+# Filas del DataFrame que se pasan a dict de una vez al alimentar un lote
+FILAS_POR_TROZO = 500
+
+
+def _numero_titulo(serie: pd.Series) -> pd.Series:
+    """Parte numérica del Nº TITULO (admite valores tipo 'EIP-0123')."""
+    return pd.to_numeric(
+        serie.astype(str).str.extract(r"(\d+)", expand=False),
+        errors="coerce"
+    )
+
+
+def filtrar_lote(
+    df: pd.DataFrame,
+    promociones=None,
+    fecha_desde=None,
+    fecha_hasta=None,
+    titulo_desde=None,
+    titulo_hasta=None,
+) -> pd.DataFrame:
+    """Filtra los alumnos por promoción, rango de fecha de expedición y rango de Nº TITULO."""
+    mascara = pd.Series(True, index=df.index)
+
+    if promociones:
+        mascara &= df["PROMOCION EN LA QUE FINALIZA"].astype(str).str.strip().isin(promociones)
+
+    if fecha_desde is not None or fecha_hasta is not None:
+        fechas = parsear_fechas(df["FECHA EXPEDICIÓN"]).dt.normalize()
+        if fecha_desde is not None:
+            mascara &= fechas >= pd.Timestamp(fecha_desde)
+        if fecha_hasta is not None:
+            mascara &= fechas <= pd.Timestamp(fecha_hasta)
+
+    if titulo_desde is not None or titulo_hasta is not None:
+        numeros = _numero_titulo(df["Nº TITULO"])
+        if titulo_desde is not None:
+            mascara &= numeros >= titulo_desde
+        if titulo_hasta is not None:
+            mascara &= numeros <= titulo_hasta
+
+    return df[mascara]
+
+
+def cumple_filtros(
+    alumno,
+    promociones=None,
+    fecha_desde=None,
+    fecha_hasta=None,
+    titulo_desde=None,
+    titulo_hasta=None,
+) -> bool:
+    """Versión fila a fila de filtrar_lote, para recorrer el Excel en streaming."""
+    if promociones and str(alumno.get("PROMOCION EN LA QUE FINALIZA")).strip() not in promociones:
+        return False
+
+    if fecha_desde is not None or fecha_hasta is not None:
+        fecha = parsear_fecha(alumno.get("FECHA EXPEDICIÓN"))
+        if fecha is None:
+            return False
+        fecha = fecha.normalize()
+        if fecha_desde is not None and fecha < pd.Timestamp(fecha_desde):
+            return False
+        if fecha_hasta is not None and fecha > pd.Timestamp(fecha_hasta):
+            return False
+
+    if titulo_desde is not None or titulo_hasta is not None:
+        m = re.search(r"\d+", str(alumno.get("Nº TITULO")))
+        if m is None:
+            return False
+        numero = int(m.group())
+        if titulo_desde is not None and numero < titulo_desde:
+            return False
+        if titulo_hasta is not None and numero > titulo_hasta:
+            return False
+
+    return True
+
+
+def generar_zip(
+    alumnos,
+    plantilla_path: str,
+    sufijo_tipo: str = "",
+    workers: int = 1,
+    progreso=None,
+    convertir_pdf: bool = False,
+    incrustar_fuentes: bool = True,
+):
+    """
+    Genera los títulos de `alumnos` (lista o iterador de filas) en un único ZIP
+    y lo devuelve abierto en modo "rb" (un BufferedReader, de los tipos que
+    admite st.download_button). Quien lo recibe debe cerrarlo.
+
+    El ZIP se escribe en streaming a un fichero temporal según llegan los
+    documentos: en memoria solo hay un documento a la vez. Los .docx y .pdf ya
+    van comprimidos, así que se guardan sin volver a comprimir (ZIP_STORED).
+    Se añade MANIFIESTO_LOTE con DNI, Nº TITULO, plantilla, fichero y SHA-256
+    de cada título.
+
+    Con incrustar_fuentes=False cada título pesa ~150 KB en lugar de ~2,7 MB.
+    """
+    descriptor, ruta_zip = tempfile.mkstemp(prefix="titulos_", suffix=".zip")
+    try:
+        with os.fdopen(descriptor, "wb") as destino:
+            _escribir_zip(destino, _documentos_del_lote(
+                alumnos, plantilla_path, sufijo_tipo, workers, progreso, convertir_pdf, incrustar_fuentes
+            ), plantilla_path)
+        return open(ruta_zip, "rb")
+    finally:
+        try:
+            os.remove(ruta_zip)  # en POSIX el fichero abierto sigue legible hasta cerrarlo
+        except OSError:
+            pass  # Windows no deja borrar un fichero abierto: queda en el directorio temporal
+
+
+def _documentos_del_lote(
+    alumnos, plantilla_path, sufijo_tipo, workers, progreso, convertir_pdf, incrustar_fuentes
+):
+    """(nombre, bytes, campos) de cada título del lote, en el orden en que se generan."""
+    campos_en_orden = deque()  # la conversión a PDF conserva el orden
+
+    def sin_campos(documentos):
+        for nombre, datos, campos in documentos:
+            campos_en_orden.append(campos)
+            yield nombre, datos
+
+    documentos = sin_campos(generar_documentos_en_paralelo(
+        alumnos, plantilla_path, sufijo_tipo, workers=workers, progreso=progreso,
+        incrustar_fuentes=incrustar_fuentes or convertir_pdf, con_campos=True,
+    ))
+    if convertir_pdf:
+        documentos = convertir_documentos(documentos)
+
+    for nombre, datos in documentos:
+        yield nombre, datos, campos_en_orden.popleft()
+
+
+def _escribir_zip(destino, documentos, plantilla_path: str):
+    usados, filas = set(), []
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_STORED) as zf:
+        for nombre, datos, campos in documentos:
+            # Evitar nombres repetidos dentro del ZIP (mismo DNI en varias filas)
+            base, ext = nombre.rsplit(".", 1)
+            candidato, n = nombre, 1
+            while candidato in usados:
+                n += 1
+                candidato = f"{base}_{n}.{ext}"
+            usados.add(candidato)
+
+            zf.writestr(candidato, datos)
+            filas.append([
+                campos["{{DNI}}"],
+                campos["{{NºTITULO}}"],
+                os.path.basename(plantilla_path),
+                candidato,
+                hashlib.sha256(datos).hexdigest(),
+            ])
+
+        manifiesto = io.StringIO()
+        escritor = csv.writer(manifiesto, delimiter=";")
+        escritor.writerow(["DNI", "Nº TITULO", "PLANTILLA", "FICHERO", "SHA256"])
+        escritor.writerows(filas)
+        # Con BOM para que Excel lo abra con las tildes bien
+        zf.writestr(MANIFIESTO_LOTE, "\ufeff" + manifiesto.getvalue(), zipfile.ZIP_DEFLATED)
+
+
+def _filas_por_trozos(df: pd.DataFrame):
+    """Filas del DataFrame como dicts, convertidas por trozos según se consumen."""
+    for inicio in range(0, len(df), FILAS_POR_TROZO):
+        yield from df.iloc[inicio:inicio + FILAS_POR_TROZO].to_dict("records")
+
+
+def generar_zip_lote(df: pd.DataFrame, plantilla_path: str, sufijo_tipo: str = "", **opciones):
+    """
+    Genera todos los títulos del DataFrame y los devuelve dentro de un único ZIP.
+    Las filas se le pasan al generador por trozos, no todas convertidas a dict.
+    """
+    return generar_zip(_filas_por_trozos(df), plantilla_path, sufijo_tipo, **opciones)
+
+
+def generar_zip_desde_excel(
+    ruta_excel: str,
+    hoja: str,
+    plantilla_path: str,
+    sufijo_tipo: str = "",
+    filtros: dict = None,
+    titulos: set = None,
+    **opciones,
+):
+    """
+    Igual que generar_zip_lote pero leyendo la hoja en streaming, sin cargarla
+    en un DataFrame: para generar lotes de registros muy grandes fuera de la
+    interfaz (que ya tiene la hoja cargada y usa generar_zip_lote). `titulos`
+    restringe el lote a esos Nº TITULO (normalizados con limpiar_numero).
+    Los títulos salen iguales que desde la hoja cargada: construir_campos
+    normaliza igual los valores de openpyxl y los de pandas.
+
+    El número de alumnos no se conoce de antemano: progreso(hechos, None).
+    """
+    filtros = filtros or {}
+    alumnos = (
+        a for a in iterar_alumnos(ruta_excel, hoja)
+        if (titulos is None or limpiar_numero(a.get("Nº TITULO")) in titulos) and cumple_filtros(a, **filtros)
+    )
+    return generar_zip(alumnos, plantilla_path, sufijo_tipo, **opciones)
+
+
+def mostrar_generacion_lote(df: pd.DataFrame, plantilla_path: str, tipo_plantilla: str, hoja: str):
+    """Sección de la interfaz para generar los títulos de una promoción completa."""
+    # Varias hojas comparten el tipo de plantilla ("NORMAL"): los widgets van por hoja y tipo
+    clave = f"{hoja}_{tipo_plantilla}"
+    with st.expander("📦 Generación por lotes"):
+        promociones_disponibles = sorted(
+            df["PROMOCION EN LA QUE FINALIZA"].dropna().astype(str).str.strip().unique()
+        )
+        promociones = st.multiselect(
+            "Promociones",
+            promociones_disponibles,
+            key=f"lote_promociones_{clave}"
+        )
+
+        col1, col2 = st.columns(2)
+        with col1:
+            usar_fechas = st.checkbox("Filtrar por fecha de expedición", key=f"lote_usar_fechas_{clave}")
+            fecha_desde = st.date_input("Desde", key=f"lote_fecha_desde_{clave}", disabled=not usar_fechas)
+            fecha_hasta = st.date_input("Hasta", key=f"lote_fecha_hasta_{clave}", disabled=not usar_fechas)
+        with col2:
+            usar_titulos = st.checkbox("Filtrar por Nº TITULO", key=f"lote_usar_titulos_{clave}")
+            titulo_desde = st.number_input("Nº TITULO desde", min_value=0, step=1, key=f"lote_titulo_desde_{clave}", disabled=not usar_titulos)
+            titulo_hasta = st.number_input("Nº TITULO hasta", min_value=0, step=1, key=f"lote_titulo_hasta_{clave}", disabled=not usar_titulos)
+
+        seleccion = filtrar_lote(
+            df,
+            promociones=promociones,
+            fecha_desde=fecha_desde if usar_fechas else None,
+            fecha_hasta=fecha_hasta if usar_fechas else None,
+            titulo_desde=titulo_desde if usar_titulos else None,
+            titulo_hasta=titulo_hasta if usar_titulos else None,
+        )
+
+        solo_pendientes = st.checkbox(
+            "Solo pendientes (nuevos o modificados desde su emisión)",
+            key=f"lote_solo_pendientes_{clave}"
+        )
+        if solo_pendientes and not seleccion.empty:
+            estados = estado_filas(seleccion, hoja)
+            st.caption(
+                f"Nuevos: {(estados == NUEVO).sum()} · "
+                f"Modificados: {(estados == MODIFICADO).sum()} · "
+                f"Ya emitidos: {(estados == EMITIDO).sum()}"
+            )
+            seleccion = seleccion[estados != EMITIDO]
+
+        workers = st.number_input(
+            "Procesos en paralelo",
+            min_value=1,
+            max_value=max(WORKERS_POR_DEFECTO, 1) * 2,
+            value=WORKERS_POR_DEFECTO,
+            step=1,
+            key=f"lote_workers_{clave}"
+        )
+
+        convertir_pdf = False
+        if conversion_disponible():
+            convertir_pdf = st.checkbox(
+                "Convertir a PDF con LibreOffice",
+                key=f"lote_convertir_pdf_{clave}"
+            )
+
+        enlazar_fuentes = st.checkbox(
+            "Sin fuentes incrustadas (descarga unas 20 veces más ligera; "
+            "las fuentes de la plantilla deben estar instaladas donde se abra)",
+            key=f"lote_enlazar_fuentes_{clave}",
+            disabled=convertir_pdf,
+        )
+
+        st.write(f"Se generarán **{len(seleccion)}** títulos.")
+
+        if st.button("🖨️ Generar lote", key=f"lote_generar_{clave}", disabled=seleccion.empty):
+            try:
+                barra = st.progress(0.0, text="Generando títulos...")
+
+                esperados = len(seleccion)
+
+                def progreso(hechos, total):
+                    # Las filas llegan en un generador: el total es el de la selección
+                    total = total or esperados
+                    barra.progress(min(hechos / total, 1.0), text=f"Generados {hechos} de {total}")
+
+                opciones = {
+                    "sufijo_tipo": tipo_plantilla,
+                    "workers": int(workers),
+                    "progreso": progreso,
+                    "convertir_pdf": convertir_pdf,
+                    "incrustar_fuentes": not enlazar_fuentes,
+                }
+                with medir("generar_lote", pdf=convertir_pdf):
+                    archivo_zip = generar_zip_lote(seleccion, plantilla_path, **opciones)
+                contar("lote_titulos", len(seleccion))
+                contar("lote_bytes", os.fstat(archivo_zip.fileno()).st_size)
+                if convertir_pdf:
+                    stats = obtener_conversor().estadisticas()
+                    st.caption(
+                        f"Conversión PDF: {stats['trabajos']} trabajos, "
+                        f"latencia media {stats['latencia_media_s']:.2f}s, "
+                        f"en cola {stats['cola']}"
+                    )
+                # download_button lee el fichero entero al llamarlo: después ya se puede cerrar.
+                # Los títulos cuentan como emitidos cuando se descargan, no al generarlos.
+                with archivo_zip:
+                    st.download_button(
+                        "📥 Descargar ZIP",
+                        archivo_zip,
+                        file_name=f"TITULOS_{tipo_plantilla.upper()}.zip",
+                        mime="application/zip",
+                        key=f"lote_descargar_{clave}",
+                        on_click=marcar_emitidos,
+                        args=(seleccion.to_dict("records"), hoja, plantilla_path),
+                    )
+            except Exception as e:
+                st.error(f"❌ Error: {e}")
@@ -0,0 +1,236 @@
+"""
+Instrumentación ligera del camino caliente (solo biblioteca estándar).
+
+- medir("paso", **etiquetas): cronómetro (context manager) que acumula
+  número de llamadas, tiempo total y máximo por paso y etiquetas, y deja el
+  paso en la traza de la ejecución actual de la página.
+- contar("nombre", valor, **etiquetas): contadores (bytes descargados...).
+- Tasas de acierto de las cachés en memoria y en disco, leídas de los
+  estadisticas_cache_* de los módulos que ya estén cargados.
+
+Salidas:
+- Logs estructurados (una línea JSON por paso) en el logger "titulos.metricas";
+  con TITULOS_LOG_METRICAS=1 se escriben además en stderr.
+- exportar_prometheus(): formato de texto de Prometheus; con
+  TITULOS_METRICAS_PROM=<ruta> se vuelca a ese fichero en cada ejecución
+  (p. ej. para el textfile collector de node_exporter).
+- mostrar_panel_diagnostico(): panel plegable de Streamlit con la traza,
+  los acumulados y las cachés (con TITULOS_DIAGNOSTICO=1 o ?diagnostico=1).
+"""
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+RUTA_PROMETHEUS = os.getenv("TITULOS_METRICAS_PROM")
+PANEL_DIAGNOSTICO = os.getenv("TITULOS_DIAGNOSTICO") == "1"
+PREFIJO = "titulos"
+MAX_TRAZA = 200
+
+# Cachés con estadísticas (aciertos/fallos); solo se consultan si el módulo ya está cargado
+FUENTES_CACHE = {
+    "hojas": ("hojas.utils.excel_utils", "estadisticas_cache_hojas"),
+    "plantillas": ("hojas.utils.plantilla_utils", "estadisticas_cache_plantillas"),
+    "resultados": ("hojas.utils.resultados_utils", "estadisticas_cache_resultados"),
+}
+
+logger = logging.getLogger("titulos.metricas")
+if os.getenv("TITULOS_LOG_METRICAS") == "1":
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+_lock = threading.Lock()
+_tiempos = {}     # (paso, etiquetas) -> [llamadas, total_s, max_s]
+_contadores = {}  # (nombre, etiquetas) -> valor
+_local = threading.local()
+
+
+def _etiquetas(etiquetas: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+
+def iniciar_traza():
+    """Empieza una traza nueva (al principio de cada ejecución de la página)."""
+    _local.traza = []
+    _local.nivel = 0
+
+
+def traza_actual() -> list:
+    """[{"paso", "nivel", "ms", ...etiquetas}] de la ejecución actual, en orden de inicio."""
+    return list(getattr(_local, "traza", []))
+
+
+@contextmanager
+def medir(paso: str, **etiquetas):
+    traza = getattr(_local, "traza", None)
+    nivel = getattr(_local, "nivel", 0)
+    entrada = {"paso": paso, "nivel": nivel, "ms": None, **etiquetas}
+    if traza is not None and len(traza) < MAX_TRAZA:
+        traza.append(entrada)  # se añade al empezar para que los pasos anidados queden debajo
+
+    _local.nivel = nivel + 1
+    inicio = time.perf_counter()
+    error = None
+    try:
+        yield entrada
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duracion = time.perf_counter() - inicio
+        _local.nivel = nivel
+        entrada["ms"] = round(duracion * 1000, 2)
+        if error:
+            entrada["error"] = error
+
+        clave = (paso, _etiquetas(etiquetas))
+        with _lock:
+            acumulado = _tiempos.setdefault(clave, [0, 0.0, 0.0])
+            acumulado[0] += 1
+            acumulado[1] += duracion
+            acumulado[2] = max(acumulado[2], duracion)
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({"evento": "paso", **entrada}, ensure_ascii=False, default=str))
+
+
+def contar(nombre: str, valor: float = 1, **etiquetas):
+    clave = (nombre, _etiquetas(etiquetas))
+    with _lock:
+        _contadores[clave] = _contadores.get(clave, 0) + valor
+
+
+def estadisticas_caches() -> dict:
+    """{cache: {"aciertos", "fallos", "tasa"}} de las cachés cuyos módulos ya se han cargado."""
+    caches = {}
+    for nombre, (modulo, funcion) in FUENTES_CACHE.items():
+        if modulo not in sys.modules:
+            continue  # no forzar imports pesados solo para medir
+        stats = getattr(importlib.import_module(modulo), funcion)()
+        total = stats["aciertos"] + stats["fallos"]
+        caches[nombre] = {**stats, "tasa": stats["aciertos"] / total if total else None}
+    return caches
+
+
+def instantanea() -> dict:
+    """Copia de los acumulados: {"tiempos": [...], "contadores": [...], "caches": {...}}."""
+    with _lock:
+        tiempos = [
+            {"paso": paso, **dict(etiquetas), "llamadas": n, "total_ms": total * 1000, "max_ms": maximo * 1000}
+            for (paso, etiquetas), (n, total, maximo) in _tiempos.items()
+        ]
+        contadores = [
+            {"nombre": nombre, **dict(etiquetas), "valor": valor}
+            for (nombre, etiquetas), valor in _contadores.items()
+        ]
+    return {"tiempos": tiempos, "contadores": contadores, "caches": estadisticas_caches()}
+
+
+def reiniciar():
+    with _lock:
+        _tiempos.clear()
+        _contadores.clear()
+
+
+# ==============================
+# 📈 Prometheus
+# ==============================
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _serie(nombre: str, etiquetas, valor) -> str:
+    if etiquetas:
+        texto = ",".join(f'{k}="{_escapar(v)}"' for k, v in etiquetas)
+        return f"{PREFIJO}_{nombre}{{{texto}}} {valor}"
+    return f"{PREFIJO}_{nombre} {valor}"
+
+
+def exportar_prometheus() -> str:
+    with _lock:
+        tiempos = sorted(_tiempos.items())
+        contadores = sorted(_contadores.items())
+
+    lineas = [
+        f"# HELP {PREFIJO}_paso_segundos Duración de cada paso instrumentado.",
+        f"# TYPE {PREFIJO}_paso_segundos summary",
+    ]
+    for (paso, etiquetas), (n, total, _) in tiempos:
+        etiquetas = (("paso", paso),) + etiquetas
+        lineas.append(_serie("paso_segundos_count", etiquetas, n))
+        lineas.append(_serie("paso_segundos_sum", etiquetas, f"{total:.6f}"))
+    lineas.append(f"# TYPE {PREFIJO}_paso_segundos_max gauge")
+    for (paso, etiquetas), (_, _, maximo) in tiempos:
+        lineas.append(_serie("paso_segundos_max", (("paso", paso),) + etiquetas, f"{maximo:.6f}"))
+
+    for nombre in sorted({nombre for (nombre, _), _ in contadores}):
+        lineas.append(f"# TYPE {PREFIJO}_{nombre}_total counter")
+        for (n, etiquetas), valor in contadores:
+            if n == nombre:
+                lineas.append(_serie(f"{nombre}_total", etiquetas, valor))
+
+    caches = estadisticas_caches()
+    for tipo in ("aciertos", "fallos"):
+        lineas.append(f"# TYPE {PREFIJO}_cache_{tipo}_total counter")
+        for cache, stats in caches.items():
+            lineas.append(_serie(f"cache_{tipo}_total", (("cache", cache),), stats[tipo]))
+
+    return "\n".join(lineas) + "\n"
+
+
+def volcar_prometheus(ruta: str = None):
+    """Escribe exportar_prometheus() en `ruta` (o TITULOS_METRICAS_PROM); sin ruta no hace nada."""
+    ruta = ruta or RUTA_PROMETHEUS
+    if not ruta:
+        return
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(exportar_prometheus())
+        os.replace(temporal, ruta)
+    except OSError as e:
+        logger.warning("No se pudieron volcar las métricas en %s: %s", ruta, e)
+
+
+# ==============================
+# 🩺 Panel de diagnóstico
+# ==============================
+def mostrar_panel_diagnostico():
+    import streamlit as st
+
+    if not (PANEL_DIAGNOSTICO or st.query_params.get("diagnostico") == "1"):
+        return
+
+    with st.expander("🩺 Diagnóstico", expanded=False):
+        st.markdown("**Esta ejecución**")
+        lineas = []
+        for paso in traza_actual():
+            extra = {k: v for k, v in paso.items() if k not in ("paso", "nivel", "ms")}
+            detalle = " ".join(f"{k}={v}" for k, v in extra.items())
+            ms = "…" if paso["ms"] is None else f"{paso['ms']:.1f} ms"
+            lineas.append(f"{'  ' * paso['nivel']}{paso['paso']}: {ms} {detalle}".rstrip())
+        st.code("\n".join(lineas), language=None)
+
+        datos = instantanea()
+        st.markdown("**Acumulado desde el arranque**")
+        st.dataframe(datos["tiempos"], hide_index=True)
+        if datos["contadores"]:
+            st.dataframe(datos["contadores"], hide_index=True)
+        if datos["caches"]:
+            st.dataframe(
+                [{"cache": nombre, **stats} for nombre, stats in datos["caches"].items()],
+                hide_index=True,
+            )
+
+        st.download_button(
+            "📈 Métricas (Prometheus)",
+            exportar_prometheus(),
+            file_name="titulos.prom",
+            mime="text/plain",
+        )
@@ -0,0 +1,304 @@
+"""
+Motor rápido de relleno de plantillas .docx a nivel de ZIP.
+
+En lugar de cargar el modelo completo de python-docx, se abre el ZIP de la
+plantilla una sola vez, se sustituyen los marcadores directamente en
+``word/document.xml`` y el resto de miembros (fuentes, imágenes, estilos...)
+se copian al documento de salida con sus bytes ya comprimidos, sin volver a
+comprimirlos.
+
+Con incrustar_fuentes=False el documento sale "con fuentes enlazadas": sin
+word/fonts/*.odttf (unos 2,5 MB por título) y con las fuentes referenciadas
+solo por nombre, así que se verá igual donde esas fuentes estén instaladas.
+"""
+import io
+import os
+import re
+import struct
+import threading
+import zipfile
+import zlib
+from collections import OrderedDict
+from xml.sax.saxutils import escape
+
+DOCUMENTO_XML = "word/document.xml"
+
+# Marcadores cuyo run se pone a 37 pt (igual que reemplazar_campos_en_docx)
+CAMPOS_TAMANO_37 = ("{{NOMBRE}}", "{{APELLIDOS}}")
+SZ_37 = '<w:sz w:val="74"/>'
+
+# Elementos que deben ir detrás de <w:sz> dentro de <w:rPr> (orden del esquema)
+_SUCESORES_SZ = (
+    "<w:szCs", "<w:highlight", "<w:u ", "<w:u/", "<w:effect", "<w:bdr", "<w:shd",
+    "<w:fitText", "<w:vertAlign", "<w:rtl", "<w:cs", "<w:em", "<w:lang",
+    "<w:eastAsianLayout", "<w:specVanish", "<w:oMath",
+)
+
+# Partes que desaparecen / se ajustan al no incrustar las fuentes
+DIRECTORIO_FUENTES = "word/fonts/"
+RELACIONES_FUENTES = "word/_rels/fontTable.xml.rels"
+TABLA_FUENTES = "word/fontTable.xml"
+AJUSTES = "word/settings.xml"
+_EMBED = re.compile(r"<w:embed(?:Regular|Bold|Italic|BoldItalic)\b[^>]*/>")
+_AJUSTES_EMBED = re.compile(r"<w:(?:embedTrueTypeFonts|embedSystemFonts|saveSubsetFonts)\b[^>]*/>")
+
+_MARCADOR = re.compile(r"\{\{[^{}<>]+\}\}")
+# Apertura/cierre de párrafo (pueden anidarse en cuadros de texto) y textos de run
+_PARRAFO_O_TEXTO = re.compile(r"<w:p[ >]|</w:p>|<w:t(?:\s[^>]*)?>([^<]*)</w:t>")
+_SZ = re.compile(r'<w:sz w:val="[^"]*"\s*/>')
+
+# Estructuras del formato ZIP (cabecera local, directorio central y fin de archivo)
+_CABECERA_LOCAL = struct.Struct("<4s2B4HL2L2H")
+_CABECERA_CENTRAL = struct.Struct("<4s4B4HL2L5H2L")
+_FIN_ARCHIVO = struct.Struct("<4s4H2LH")
+
+MAX_PLANTILLAS_EN_CACHE = 8
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class PlantillaZip:
+    """Plantilla precargada: miembros comprimidos en bruto + document.xml en texto."""
+
+    def __init__(self, ruta: str, incrustar_fuentes: bool = True):
+        self.ruta = ruta
+        self.incrustar_fuentes = incrustar_fuentes
+        self.miembros = []  # [(ZipInfo, bytes comprimidos, método, crc, tamaño)]
+
+        with open(ruta, "rb") as f:
+            contenido = f.read()
+
+        with zipfile.ZipFile(io.BytesIO(contenido)) as zf:
+            for info in zf.infolist():
+                if info.filename == DOCUMENTO_XML:
+                    self.documento_xml = zf.read(info).decode("utf-8")
+
+                if incrustar_fuentes:
+                    self.miembros.append(
+                        (info, _leer_bruto(contenido, info), info.compress_type, info.CRC, info.file_size)
+                    )
+                    continue
+
+                datos = quitar_fuentes_de_miembro(info.filename, zf.read(info))
+                if datos is None:
+                    continue
+                self.miembros.append((info, *_comprimir(datos)))
+
+        # Marcadores partidos en varios runs: este motor no los ve
+        self.marcadores_partidos = marcadores_partidos(self.documento_xml)
+
+    def admite(self, campos: dict) -> bool:
+        return not any(campo in self.marcadores_partidos for campo in campos)
+
+    def escribir(self, campos: dict, destino):
+        """Escribe el .docx relleno en `destino` (fichero binario abierto, BytesIO...)."""
+        if not self.admite(campos):
+            partidos = sorted(c for c in campos if c in self.marcadores_partidos)
+            raise ValueError(
+                f"La plantilla {os.path.basename(self.ruta)} tiene marcadores partidos en "
+                f"varios runs ({', '.join(partidos)}): usa el motor \"docx\" o \"auto\"."
+            )
+        xml = sustituir_en_xml(self.documento_xml, campos).encode("utf-8")
+        compresor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        xml_comprimido = compresor.compress(xml) + compresor.flush()
+
+        escritor = _EscritorZip(destino)
+        for info, bruto, metodo, crc, tamano in self.miembros:
+            if info.filename == DOCUMENTO_XML:
+                escritor.escribir(info, xml_comprimido, zipfile.ZIP_DEFLATED,
+                                  zlib.crc32(xml), len(xml))
+            else:
+                escritor.escribir(info, bruto, metodo, crc, tamano)
+        escritor.cerrar()
+
+    def renderizar(self, campos: dict) -> bytes:
+        salida = io.BytesIO()
+        self.escribir(campos, salida)
+        return salida.getvalue()
+
+
+def _comprimir(datos: bytes) -> tuple:
+    """(bytes comprimidos, método, crc, tamaño) de un miembro que se ha modificado."""
+    compresor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    return compresor.compress(datos) + compresor.flush(), zipfile.ZIP_DEFLATED, zlib.crc32(datos), len(datos)
+
+
+def quitar_fuentes_de_miembro(nombre: str, datos: bytes):
+    """
+    Versión "fuentes enlazadas" de un miembro del .docx: None si el miembro
+    sobra (las fuentes y sus relaciones) o los datos, ajustados si hace falta.
+    """
+    if nombre.startswith(DIRECTORIO_FUENTES) or nombre == RELACIONES_FUENTES:
+        return None
+    if nombre == TABLA_FUENTES:
+        return _EMBED.sub("", datos.decode("utf-8")).encode("utf-8")
+    if nombre == AJUSTES:
+        return _AJUSTES_EMBED.sub("", datos.decode("utf-8")).encode("utf-8")
+    return datos
+
+
+def quitar_fuentes(contenido: bytes) -> bytes:
+    """Convierte un .docx ya generado en uno con las fuentes enlazadas (sin incrustar)."""
+    salida = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(contenido)) as origen, \
+            zipfile.ZipFile(salida, "w", zipfile.ZIP_DEFLATED) as destino:
+        for info in origen.infolist():
+            datos = quitar_fuentes_de_miembro(info.filename, origen.read(info))
+            if datos is not None:
+                destino.writestr(info, datos, zipfile.ZIP_DEFLATED)
+    return salida.getvalue()
+
+
+def _leer_bruto(contenido: bytes, info: zipfile.ZipInfo) -> bytes:
+    """Bytes comprimidos de un miembro tal cual están en el ZIP."""
+    cabecera = _CABECERA_LOCAL.unpack_from(contenido, info.header_offset)
+    inicio = info.header_offset + _CABECERA_LOCAL.size + cabecera[10] + cabecera[11]
+    return contenido[inicio:inicio + info.compress_size]
+
+
+def _fecha_dos(date_time):
+    anio, mes, dia, hora, minuto, segundo = date_time
+    fecha = (anio - 1980) << 9 | mes << 5 | dia
+    hora_dos = hora << 11 | minuto << 5 | (segundo // 2)
+    return hora_dos, fecha
+
+
+class _EscritorZip:
+    """
+    Escritor mínimo de ZIP que acepta datos ya comprimidos. Lleva la cuenta de
+    lo escrito, así que `destino` no necesita tell() ni seek().
+    """
+
+    def __init__(self, destino):
+        self.destino = destino
+        self.central = []
+        self.posicion = 0
+
+    def _write(self, datos: bytes):
+        self.destino.write(datos)
+        self.posicion += len(datos)
+
+    def escribir(self, info, datos, metodo, crc, tamano):
+        nombre = info.filename.encode("utf-8")
+        flags = 0x800 if not info.filename.isascii() else 0
+        hora, fecha = _fecha_dos(info.date_time)
+        offset = self.posicion
+
+        self._write(_CABECERA_LOCAL.pack(
+            b"PK\x03\x04", 20, 0, flags, metodo, hora, fecha,
+            crc, len(datos), tamano, len(nombre), 0,
+        ))
+        self._write(nombre)
+        self._write(datos)
+
+        self.central.append(_CABECERA_CENTRAL.pack(
+            b"PK\x01\x02", 20, 0, 20, 0, flags, metodo, hora, fecha,
+            crc, len(datos), tamano, len(nombre), 0, 0, 0, 0,
+            info.external_attr, offset,
+        ) + nombre)
+
+    def cerrar(self):
+        inicio = self.posicion
+        for entrada in self.central:
+            self._write(entrada)
+        self._write(_FIN_ARCHIVO.pack(
+            b"PK\x05\x06", 0, 0, len(self.central), len(self.central),
+            self.posicion - inicio, inicio, 0,
+        ))
+
+
+def _ajustar_rpr(run_cabecera: str) -> str:
+    """Devuelve la cabecera del run (<w:r ...><w:rPr>...) con tamaño 37 pt."""
+    if _SZ.search(run_cabecera):
+        return _SZ.sub(SZ_37, run_cabecera, count=1)
+
+    fin_rpr = run_cabecera.find("</w:rPr>")
+    if fin_rpr == -1:
+        cierre = run_cabecera.find(">") + 1
+        return run_cabecera[:cierre] + "<w:rPr>" + SZ_37 + "</w:rPr>" + run_cabecera[cierre:]
+
+    posicion = fin_rpr
+    for sucesor in _SUCESORES_SZ:
+        i = run_cabecera.find(sucesor)
+        if i != -1:
+            posicion = min(posicion, i)
+    return run_cabecera[:posicion] + SZ_37 + run_cabecera[posicion:]
+
+
+def marcadores_partidos(xml: str) -> set:
+    """
+    Marcadores que aparecen al menos una vez partidos entre varios <w:t> de un
+    mismo párrafo, aunque en otro sitio estén enteros: se comparan, párrafo a
+    párrafo, las apariciones en el texto unido con las que hay en cada <w:t>.
+    """
+    partidos = set()
+    pila = []  # [[textos de los <w:t>]] de los párrafos abiertos
+    for m in _PARRAFO_O_TEXTO.finditer(xml):
+        etiqueta = m.group()
+        if etiqueta.startswith("<w:p"):
+            pila.append([])
+        elif etiqueta == "</w:p>":
+            if not pila:
+                continue
+            textos = pila.pop()
+            unido = "".join(textos)
+            for marcador in set(_MARCADOR.findall(unido)):
+                enteros = sum(t.count(marcador) for t in textos)
+                if unido.count(marcador) > enteros:
+                    partidos.add(marcador)
+        elif pila:
+            pila[-1].append(m.group(1))
+    return partidos
+
+
+def sustituir_en_xml(xml: str, campos: dict) -> str:
+    """Sustituye los marcadores en el XML del documento."""
+    presentes = [c for c in campos if c in xml]
+    if not presentes:
+        return xml
+
+    patron = re.compile("|".join(re.escape(c) for c in sorted(presentes, key=len, reverse=True)))
+    cambios = {}  # inicio -> (fin, texto nuevo)
+
+    for m in patron.finditer(xml):
+        cambios[m.start()] = (m.end(), escape(campos[m.group()]))
+
+        if m.group() in CAMPOS_TAMANO_37:
+            inicio_run = max(xml.rfind("<w:r>", 0, m.start()), xml.rfind("<w:r ", 0, m.start()))
+            fin_cabecera = xml.rfind("<w:t", inicio_run, m.start())
+            if inicio_run != -1 and fin_cabecera != -1 and inicio_run not in cambios:
+                cambios[inicio_run] = (fin_cabecera, _ajustar_rpr(xml[inicio_run:fin_cabecera]))
+
+    partes, cursor = [], 0
+    for inicio in sorted(cambios):
+        fin, nuevo = cambios[inicio]
+        partes.append(xml[cursor:inicio])
+        partes.append(nuevo)
+        cursor = fin
+    partes.append(xml[cursor:])
+    return "".join(partes)
+
+
+def obtener_plantilla_zip(plantilla_path: str, incrustar_fuentes: bool = True) -> PlantillaZip:
+    ruta = os.path.abspath(plantilla_path)
+    clave = (ruta, os.path.getmtime(ruta), incrustar_fuentes)
+
+    with _cache_lock:
+        plantilla = _cache.get(clave)
+        if plantilla is not None:
+            _cache.move_to_end(clave)
+            return plantilla
+
+    plantilla = PlantillaZip(ruta, incrustar_fuentes)
+    with _cache_lock:
+        for vieja in [c for c in _cache if c[0] == ruta and c[2] == incrustar_fuentes]:
+            del _cache[vieja]
+        _cache[clave] = plantilla
+        while len(_cache) > MAX_PLANTILLAS_EN_CACHE:
+            _cache.popitem(last=False)
+    return plantilla
+
+
+def renderizar_docx(plantilla_path: str, campos: dict, incrustar_fuentes: bool = True) -> bytes:
+    """Genera el .docx relleno y lo devuelve en memoria."""
+    return obtener_plantilla_zip(plantilla_path, incrustar_fuentes).renderizar(campos)
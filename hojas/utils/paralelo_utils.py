@@ -0,0 +1,102 @@
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from hojas.utils.motor_zip_utils import obtener_plantilla_zip
+from hojas.utils.plantilla_utils import generar_documentos, obtener_plantilla_indexada
+
+# Nº de procesos por defecto (configurable con la variable de entorno TITULOS_WORKERS)
+WORKERS_POR_DEFECTO = int(os.getenv("TITULOS_WORKERS", "0")) or (os.cpu_count() or 1)
+TAMANO_BLOQUE_POR_DEFECTO = 25
+
+
+def _iniciar_worker(plantilla_path: str, motor: str, incrustar_fuentes: bool = True):
+    """
+    Precarga la plantilla en la caché del proceso antes de recibir trabajo,
+    solo para el motor que se va a usar: con "auto", python-docx solo hace
+    falta si la plantilla tiene marcadores partidos.
+    """
+    partidos = False
+    if motor in ("auto", "zip"):
+        partidos = bool(obtener_plantilla_zip(plantilla_path, incrustar_fuentes).marcadores_partidos)
+    if motor == "docx" or (motor == "auto" and partidos):
+        obtener_plantilla_indexada(plantilla_path)
+
+
+def _renderizar_bloque(alumnos: list, plantilla_path: str, sufijo_tipo: str, opciones: dict) -> list:
+    return list(generar_documentos(alumnos, plantilla_path, sufijo_tipo, **opciones))
+
+
+def _bloques(alumnos, tamano: int):
+    bloque = []
+    for alumno in alumnos:
+        bloque.append(dict(alumno))
+        if len(bloque) == tamano:
+            yield bloque
+            bloque = []
+    if bloque:
+        yield bloque
+
+
+def generar_documentos_en_paralelo(
+    alumnos,
+    plantilla_path: str,
+    sufijo_tipo: str = "",
+    workers: int = None,
+    tamano_bloque: int = TAMANO_BLOQUE_POR_DEFECTO,
+    progreso=None,
+    motor: str = "auto",
+    incrustar_fuentes: bool = True,
+    con_campos: bool = False,
+):
+    """
+    Igual que generar_documentos, pero repartiendo los alumnos en bloques entre
+    varios procesos. Devuelve (nombre_fichero, bytes[, campos]) según van terminando los
+    bloques, por lo que el orden puede no coincidir con el de entrada.
+
+    progreso(hechos, total) se llama cada vez que termina un bloque; total es
+    None si no se conoce el número de alumnos de antemano.
+    """
+    workers = workers or WORKERS_POR_DEFECTO
+    opciones = {"motor": motor, "incrustar_fuentes": incrustar_fuentes, "con_campos": con_campos}
+    total = len(alumnos) if hasattr(alumnos, "__len__") else None
+
+    if workers <= 1:
+        documentos = generar_documentos(alumnos, plantilla_path, sufijo_tipo, **opciones)
+        for hechos, resultado in enumerate(documentos, 1):
+            yield resultado
+            if progreso:
+                progreso(hechos, total)
+        return
+
+    hechos = 0
+    bloques = _bloques(alumnos, tamano_bloque)
+    # "spawn" y no fork: el servidor de Streamlit tiene varios hilos y un hijo
+    # creado con fork mientras otro hilo tiene un lock (cachés, logging) se bloquea
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_iniciar_worker,
+        initargs=(plantilla_path, motor, incrustar_fuentes),
+    ) as executor:
+        # Como mucho dos bloques en vuelo por proceso para no acumular resultados en memoria
+        pendientes = set()
+        for bloque in bloques:
+            pendientes.add(executor.submit(_renderizar_bloque, bloque, plantilla_path, sufijo_tipo, opciones))
+            if len(pendientes) < workers * 2:
+                continue
+            terminados, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                for resultado in futuro.result():
+                    hechos += 1
+                    yield resultado
+                if progreso:
+                    progreso(hechos, total)
+
+        while pendientes:
+            terminados, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                for resultado in futuro.result():
+                    hechos += 1
+                    yield resultado
+                if progreso:
+                    progreso(hechos, total)
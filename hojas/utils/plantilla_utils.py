@@ -1,8 +1,31 @@
+import copy
+import io
 import os
-import tempfile
+import re
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
 import pandas as pd
-from docx import Document
-from docx.shared import Pt
+from hojas.utils.fecha_utils import columna_texto, formatear_fecha
+from hojas.utils.motor_zip_utils import CAMPOS_TAMANO_37, obtener_plantilla_zip, quitar_fuentes
+from hojas.utils.metricas_utils import contar, medir
+from hojas.utils.resultados_utils import obtener_o_generar
+
+# python-docx solo se importa cuando hace falta el motor "docx": el motor
+# "zip" (el habitual) no lo necesita y así no retrasa el arranque.
+if TYPE_CHECKING:
+    from docx.document import Document
+
+# Caché de plantillas ya parseadas (clave: ruta absoluta + mtime)
+MAX_PLANTILLAS_EN_CACHE = 8
+_cache_plantillas = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"aciertos": 0, "fallos": 0}
+
+MARCADOR = re.compile(r"\{\{[^{}]+\}\}")
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_P, W_R, W_TBL, W_TR, W_TC = (_W + t for t in ("p", "r", "tbl", "tr", "tc"))
 
 
 def limpiar(valor):
@@ -11,46 +34,233 @@ def limpiar(valor):
     return str(valor).strip()
 
 
-def reemplazar_campos_en_docx(doc: Document, campos: dict):
-    for p in doc.paragraphs:
-        for campo, valor in campos.items():
-            if campo in p.text:
-                for run in p.runs:
-                    if campo in run.text:
-                        run.text = run.text.replace(campo, valor)
-                        if campo in ("{{NOMBRE}}", "{{APELLIDOS}}"):
-                            run.font.size = Pt(37)
+def limpiar_numero(valor):
+    """Como limpiar, pero un número entero leído como float (101.0) queda como "101"."""
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return limpiar(valor)
+
+
+def obtener_plantilla_indexada(plantilla_path: str):
+    """
+    Devuelve (copia de la plantilla, índice de marcadores).
+    El .docx solo se descomprime, parsea e indexa la primera vez (o si cambia
+    en disco); el resto de llamadas copian el documento ya cargado en memoria.
+    """
+    ruta = os.path.abspath(plantilla_path)
+    clave = (ruta, os.path.getmtime(ruta))
+
+    with _cache_lock:
+        plantilla = _cache_plantillas.get(clave)
+        if plantilla is not None:
+            _cache_plantillas.move_to_end(clave)
+            _cache_stats["aciertos"] += 1
+
+    if plantilla is None:
+        from docx import Document
+
+        doc = Document(ruta)
+        plantilla = (doc, indexar_marcadores(doc))
+        with _cache_lock:
+            _cache_stats["fallos"] += 1
+            # Descartar versiones anteriores de la misma plantilla
+            for vieja in [c for c in _cache_plantillas if c[0] == ruta]:
+                del _cache_plantillas[vieja]
+            _cache_plantillas[clave] = plantilla
+            while len(_cache_plantillas) > MAX_PLANTILLAS_EN_CACHE:
+                _cache_plantillas.popitem(last=False)
+
+    doc, indice = plantilla
+    return copy.deepcopy(doc), indice
+
+
+def obtener_plantilla(plantilla_path: str) -> "Document":
+    """Copia de la plantilla lista para rellenar (ver obtener_plantilla_indexada)."""
+    return obtener_plantilla_indexada(plantilla_path)[0]
+
+
+def estadisticas_cache_plantillas() -> dict:
+    """Aciertos, fallos y número de plantillas cargadas en la caché."""
+    with _cache_lock:
+        return {**_cache_stats, "plantillas": len(_cache_plantillas)}
+
+
+def vaciar_cache_plantillas():
+    with _cache_lock:
+        _cache_plantillas.clear()
+        _cache_stats["aciertos"] = 0
+        _cache_stats["fallos"] = 0
+
+
+def _raiz(doc):
+    """Elemento XML desde el que se recorre el documento (o la celda)."""
+    from docx.document import Document as DocumentoDocx
+
+    if isinstance(doc, DocumentoDocx):
+        return doc.element.body
+    return doc._element
+
+
+def _recorrer_parrafos(elemento, ruta=()):
+    """Recorre párrafos del cuerpo y de las tablas (recursivamente) con su ruta de índices."""
+    for i, hijo in enumerate(elemento):
+        if hijo.tag == W_P:
+            yield ruta + (i,), hijo
+        elif hijo.tag in (W_TBL, W_TR, W_TC):
+            yield from _recorrer_parrafos(hijo, ruta + (i,))
 
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                reemplazar_campos_en_docx(cell, campos)
 
+def indexar_marcadores(doc) -> list:
+    """
+    Localiza una sola vez los marcadores {{...}} del documento.
 
-def generar_documento(alumno, plantilla_path: str, sufijo_tipo: str = "") -> str:
-    doc = Document(plantilla_path)
+    Devuelve una lista de (ruta_parrafo, marcador, tramos), donde tramos es
+    [(indice_run, inicio, fin), ...] con la parte del marcador que ocupa cada
+    run. Un marcador partido en varios runs tiene varios tramos.
+    """
+    from docx.text.run import Run
 
-    fecha = alumno.get("FECHA")
-    fecha_exp = alumno.get("FECHA EXPEDICIÓN")
+    indice = []
+    for ruta, p in _recorrer_parrafos(_raiz(doc)):
+        runs = [(i, Run(hijo, None).text) for i, hijo in enumerate(p) if hijo.tag == W_R]
+        texto = "".join(t for _, t in runs)
+        if "{{" not in texto:
+            continue
 
-    fecha_str = pd.to_datetime(fecha).strftime("%d/%m/%Y") if pd.notna(fecha) else ""
-    fecha_exp_str = pd.to_datetime(fecha_exp).strftime("%d/%m/%Y") if pd.notna(fecha_exp) else ""
+        for m in MARCADOR.finditer(texto):
+            tramos, desplazamiento = [], 0
+            for i, t in runs:
+                inicio = max(m.start(), desplazamiento)
+                fin = min(m.end(), desplazamiento + len(t))
+                if inicio < fin:
+                    tramos.append((i, inicio - desplazamiento, fin - desplazamiento))
+                desplazamiento += len(t)
+            indice.append((ruta, m.group(), tramos))
 
-    campos = {
+    return indice
+
+
+def reemplazar_campos_en_docx(doc: "Document", campos: dict, indice: list = None):
+    from docx.shared import Pt
+    from docx.text.run import Run
+
+    if indice is None:
+        indice = indexar_marcadores(doc)
+
+    raiz = _raiz(doc)
+    # En orden inverso para que los desplazamientos de cada run sigan siendo válidos
+    for ruta, marcador, tramos in reversed(indice):
+        if marcador not in campos:
+            continue
+
+        p = raiz
+        for i in ruta:
+            p = p[i]
+
+        for n, (i_run, inicio, fin) in enumerate(tramos):
+            run = Run(p[i_run], None)
+            texto = run.text
+            nuevo = campos[marcador] if n == 0 else ""
+            run.text = texto[:inicio] + nuevo + texto[fin:]
+            if n == 0 and marcador in CAMPOS_TAMANO_37:
+                run.font.size = Pt(37)
+
+
+def construir_campos(alumno) -> dict:
+    """Valores de los marcadores {{...}} de la plantilla para un alumno."""
+    # Las hojas preparadas ya traen las fechas formateadas (fecha_utils.normalizar_fechas)
+    fecha_str, fecha_exp_str = (
+        alumno[columna_texto(c)] if columna_texto(c) in alumno else formatear_fecha(alumno.get(c))
+        for c in ("FECHA", "FECHA EXPEDICIÓN")
+    )
+
+    return {
         "{{NOMBRE}}": limpiar(alumno.get("NOMBRE")),
         "{{APELLIDOS}}": limpiar(alumno.get("APELLIDOS")),
         "{{DNI}}": limpiar(alumno.get("DNI ALUMNO")),
-        "{{PROMOCION}}": limpiar(alumno.get("PROMOCION EN LA QUE FINALIZA")),
+        "{{PROMOCION}}": limpiar_numero(alumno.get("PROMOCION EN LA QUE FINALIZA")),
         "{{FECHA EXPEDICIÓN}}": fecha_exp_str,
         "{{FECHA}}": fecha_str,
-        "{{NºTITULO}}": limpiar(alumno.get("Nº TITULO")),
+        # Igual con la columna leída como int o como float (si hay filas sin número)
+        "{{NºTITULO}}": limpiar_numero(alumno.get("Nº TITULO")),
     }
 
-    reemplazar_campos_en_docx(doc, campos)
 
-    temp_docx = tempfile.mktemp(suffix=".docx")
-    output_name = f"TITULO_{sufijo_tipo.upper() or 'SIN_TIPO'}_{campos['{{DNI}}'] or 'sin_dni'}.docx"
-    final_path = os.path.join(os.path.dirname(temp_docx), output_name)
-    doc.save(final_path)
+def nombre_documento(campos: dict, sufijo_tipo: str = "", extension: str = "docx") -> str:
+    return f"TITULO_{sufijo_tipo.upper() or 'SIN_TIPO'}_{campos['{{DNI}}'] or 'sin_dni'}.{extension}"
+
+
+def escribir_documento(
+    campos: dict, plantilla_path: str, destino, motor: str = "auto", incrustar_fuentes: bool = True
+):
+    """
+    Rellena la plantilla y escribe el .docx en `destino` (BytesIO,
+    SpooledTemporaryFile, fichero abierto en binario...), sin pasar por disco.
+
+    motor="zip" sustituye directamente sobre el XML del ZIP (rápido),
+    motor="docx" usa python-docx y motor="auto" elige "zip" salvo que la
+    plantilla tenga marcadores partidos en varios runs (con motor="zip" eso
+    es un ValueError, para no entregar un título a medio rellenar).
+
+    incrustar_fuentes=False genera el documento sin las fuentes incrustadas
+    (ver motor_zip_utils), mucho más pequeño.
+    """
+    if motor in ("auto", "zip"):
+        plantilla_zip = obtener_plantilla_zip(plantilla_path, incrustar_fuentes)
+        if motor == "zip" or plantilla_zip.admite(campos):
+            plantilla_zip.escribir(campos, destino)
+            return
+
+    doc, indice = obtener_plantilla_indexada(plantilla_path)
+    reemplazar_campos_en_docx(doc, campos, indice)
+    if incrustar_fuentes:
+        doc.save(destino)
+        return
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    destino.write(quitar_fuentes(buffer.getvalue()))
+
+
+def renderizar_documento(
+    campos: dict, plantilla_path: str, motor: str = "auto", incrustar_fuentes: bool = True
+) -> bytes:
+    """Igual que escribir_documento, pero devuelve el .docx como bytes."""
+    buffer = io.BytesIO()
+    escribir_documento(campos, plantilla_path, buffer, motor, incrustar_fuentes)
+    return buffer.getvalue()
+
+
+def generar_documento(alumno, plantilla_path: str, sufijo_tipo: str = "", motor: str = "auto") -> tuple:
+    """
+    Título de un alumno en memoria: devuelve (nombre_fichero, bytes), listo
+    para st.download_button. Si ya se generó el mismo título (misma plantilla
+    y mismos campos) se devuelve el guardado en resultados_utils.
+    """
+    def renderizar():
+        with medir("renderizar_documento", motor=motor):
+            return renderizar_documento(campos, plantilla_path, motor)
+
+    with medir("generar_documento", plantilla=os.path.basename(plantilla_path)):
+        with medir("construir_campos"):
+            campos = construir_campos(alumno)
+        datos = obtener_o_generar(plantilla_path, campos, renderizar, motor=motor)
+    contar("documento_bytes", len(datos))
+    return nombre_documento(campos, sufijo_tipo), datos
+
 
-    return final_path
+def generar_documentos(
+    alumnos,
+    plantilla_path: str,
+    sufijo_tipo: str = "",
+    motor: str = "auto",
+    incrustar_fuentes: bool = True,
+    con_campos: bool = False,
+):
+    """
+    Genera un título por alumno y va devolviendo (nombre_fichero, bytes), o
+    (nombre_fichero, bytes, campos) con con_campos=True.
+    """
+    for alumno in alumnos:
+        campos = construir_campos(alumno)
+        datos = renderizar_documento(campos, plantilla_path, motor, incrustar_fuentes)
+        yield (nombre_documento(campos, sufijo_tipo), datos) + ((campos,) if con_campos else ())
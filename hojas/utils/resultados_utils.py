@@ -0,0 +1,121 @@
+"""
+Caché en disco de títulos ya generados.
+
+La clave es el hash del contenido de la plantilla más los valores de los
+marcadores (y las opciones de generación), así que pedir dos veces el mismo
+título devuelve el fichero guardado, y cambiar la plantilla o la fila del
+alumno genera uno nuevo sin tener que invalidar nada a mano.
+
+El tamaño total está acotado (TITULOS_CACHE_RESULTADOS_MB, 0 la desactiva);
+al superarlo se borran los títulos usados hace más tiempo (LRU por fecha de
+modificación, que se actualiza en cada acierto).
+"""
+import hashlib
+import json
+import os
+import threading
+from hojas.utils.excel_utils import hash_archivo
+
+DIRECTORIO_RESULTADOS = os.getenv("TITULOS_CACHE_RESULTADOS", ".resultados_titulos")
+MAX_BYTES = int(os.getenv("TITULOS_CACHE_RESULTADOS_MB", "512")) * 1024 * 1024
+
+# Cambiar si cambia la forma de generar los documentos (invalida todo lo guardado)
+VERSION = 1
+
+_lock = threading.Lock()
+_stats = {"aciertos": 0, "fallos": 0}
+
+
+def clave_resultado(plantilla_path: str, campos: dict, **opciones) -> str:
+    contenido = {
+        "version": VERSION,
+        "plantilla": hash_archivo(plantilla_path),
+        "campos": campos,
+        "opciones": opciones,
+    }
+    return hashlib.sha256(json.dumps(contenido, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _ruta(clave: str, extension: str, directorio: str) -> str:
+    return os.path.join(directorio, clave[:2], f"{clave}.{extension}")
+
+
+def leer(clave: str, extension: str = "docx", directorio: str = None):
+    """Bytes guardados para la clave, o None."""
+    ruta = _ruta(clave, extension, directorio or DIRECTORIO_RESULTADOS)
+    try:
+        with open(ruta, "rb") as f:
+            datos = f.read()
+        os.utime(ruta)  # usado ahora: lo último en desalojarse
+    except OSError:
+        with _lock:
+            _stats["fallos"] += 1
+        return None
+
+    with _lock:
+        _stats["aciertos"] += 1
+    return datos
+
+
+def guardar(clave: str, datos: bytes, extension: str = "docx", directorio: str = None, max_bytes: int = None):
+    directorio = directorio or DIRECTORIO_RESULTADOS
+    ruta = _ruta(clave, extension, directorio)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, "wb") as f:
+        f.write(datos)
+    os.replace(temporal, ruta)
+
+    desalojar(directorio, MAX_BYTES if max_bytes is None else max_bytes)
+
+
+def desalojar(directorio: str = None, max_bytes: int = MAX_BYTES) -> int:
+    """Borra los ficheros usados hace más tiempo hasta quedar por debajo de max_bytes."""
+    directorio = directorio or DIRECTORIO_RESULTADOS
+    with _lock:
+        ficheros = []
+        for raiz, _, nombres in os.walk(directorio):
+            for nombre in nombres:
+                if nombre.endswith(".tmp"):
+                    continue
+                ruta = os.path.join(raiz, nombre)
+                try:
+                    info = os.stat(ruta)
+                except OSError:
+                    continue
+                ficheros.append((info.st_mtime, info.st_size, ruta))
+
+        total = sum(tamano for _, tamano, _ in ficheros)
+        borrados = 0
+        for _, tamano, ruta in sorted(ficheros):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(ruta)
+            except OSError:
+                continue
+            total -= tamano
+            borrados += 1
+        return borrados
+
+
+def obtener_o_generar(plantilla_path: str, campos: dict, generar, extension: str = "docx", **opciones) -> bytes:
+    """Devuelve el resultado guardado o llama a generar() y lo guarda."""
+    if MAX_BYTES <= 0:
+        return generar()
+
+    clave = clave_resultado(plantilla_path, campos, extension=extension, **opciones)
+    datos = leer(clave, extension)
+    if datos is None:
+        datos = generar()
+        try:
+            guardar(clave, datos, extension)
+        except OSError:
+            pass  # sin disco para la caché el título se sigue entregando
+    return datos
+
+
+def estadisticas_cache_resultados() -> dict:
+    with _lock:
+        return dict(_stats)
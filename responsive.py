@@ -1,6 +1,5 @@
 # responsive.py
 
-from streamlit_js_eval import streamlit_js_eval
 import time
 
 def get_screen_size():
@@ -8,6 +7,9 @@ def get_screen_size():
     Devuelve (width, height) del gráfico en función del tamaño de pantalla.
     Usa streamlit_js_eval y fuerza actualización cada 5 segundos.
     """
+    # Importación diferida: el componente solo se carga si se usa
+    from streamlit_js_eval import streamlit_js_eval
+
     # Clave dinámica para que se actualice con cada render
     key = f"screen_width_{int(time.time() // 5)}"
 
@@ -0,0 +1,162 @@
+# sharepoint_auth.py
+"""
+Autenticación y resolución de IDs de SharePoint compartida por app.py y
+descargar_excel_sharepoint.py.
+
+- Un único ConfidentialClientApplication (con su caché de tokens) por proceso.
+- El token se renueva en segundo plano antes de que caduque.
+- site_id, drive_id e item_id se resuelven una vez y se memorizan.
+"""
+import threading
+import time
+import graph_client
+from graph_client import GRAPH
+
+SCOPES = ["https://graph.microsoft.com/.default"]
+
+# MSAL considera caducado un token al que le quedan menos de 5 minutos, así que
+# renovando con un margen menor siempre se obtiene un token nuevo.
+MARGEN_REFRESCO_S = 240
+
+_lock = threading.RLock()
+_clientes = {}   # (tenant_id, client_id) -> ConfidentialClientApplication
+_tokens = {}     # (tenant_id, client_id) -> {"token": ..., "expira": ...}
+_timers = {}     # (tenant_id, client_id) -> threading.Timer
+_ids = {}        # clave de la consulta -> id
+
+
+class ErrorSharePoint(RuntimeError):
+    """Error al autenticar o al consultar Microsoft Graph."""
+
+
+def _clave(config):
+    return (config["tenant_id"], config["client_id"])
+
+
+def _cliente(config):
+    clave = _clave(config)
+    with _lock:
+        if clave not in _clientes:
+            # msal (y cryptography) solo se cargan cuando hay que pedir un token
+            from msal import ConfidentialClientApplication
+
+            _clientes[clave] = ConfidentialClientApplication(
+                client_id=config["client_id"],
+                client_credential=config["client_secret"],
+                authority=f"https://login.microsoftonline.com/{config['tenant_id']}",
+            )
+        return _clientes[clave]
+
+
+def _pedir_token(config):
+    result = _cliente(config).acquire_token_for_client(scopes=SCOPES)
+    token = result.get("access_token")
+    if not token:
+        raise ErrorSharePoint(
+            f"No se pudo obtener token: {result.get('error')} {result.get('error_description', '')}"
+        )
+
+    clave = _clave(config)
+    expira = time.time() + int(result.get("expires_in", 3600))
+    with _lock:
+        _tokens[clave] = {"token": token, "expira": expira}
+        _programar_refresco(config, expira)
+    return token
+
+
+def _programar_refresco(config, expira):
+    """Renueva el token en segundo plano MARGEN_REFRESCO_S antes de que caduque."""
+    clave = _clave(config)
+    anterior = _timers.pop(clave, None)
+    if anterior is not None:
+        anterior.cancel()
+
+    def refrescar():
+        try:
+            _pedir_token(config)
+        except Exception:
+            # Si falla, el siguiente get_token lo volverá a intentar en primer plano
+            pass
+
+    timer = threading.Timer(max(expira - time.time() - MARGEN_REFRESCO_S, 0), refrescar)
+    timer.daemon = True
+    timer.start()
+    _timers[clave] = timer
+
+
+def get_token(config):
+    """Token de acceso vigente; solo llama a Azure AD si no hay uno válido en memoria."""
+    with _lock:
+        actual = _tokens.get(_clave(config))
+    if actual and actual["expira"] - time.time() > 60:
+        return actual["token"]
+    return _pedir_token(config)
+
+
+def _get_json(url, token):
+    try:
+        return graph_client.get_json(url, token)
+    except (graph_client.ErrorGraph, OSError) as e:
+        raise ErrorSharePoint(str(e)) from None
+
+
+def _memorizar(clave, resolver):
+    with _lock:
+        if clave in _ids:
+            return _ids[clave]
+    valor = resolver()
+    with _lock:
+        _ids[clave] = valor
+    return valor
+
+
+def get_site_id(config):
+    def resolver():
+        url = f"{GRAPH}/sites/{config['domain']}:/sites/{config['site_name']}"
+        try:
+            return _get_json(url, get_token(config))["id"]
+        except ErrorSharePoint as e:
+            raise ErrorSharePoint(f"Error al obtener site_id: {e}") from None
+
+    return _memorizar(("site", config["domain"], config["site_name"]), resolver)
+
+
+def get_drive_id(config, site_id):
+    """Drive (biblioteca de Documentos) por defecto del sitio."""
+    def resolver():
+        try:
+            return _get_json(f"{GRAPH}/sites/{site_id}/drive", get_token(config))["id"]
+        except ErrorSharePoint as e:
+            raise ErrorSharePoint(f"Error al obtener drive_id: {e}") from None
+
+    return _memorizar(("drive", site_id), resolver)
+
+
+def find_file_in_drive(config, drive_id, file_name):
+    """
+    Busca el archivo por nombre dentro del drive y devuelve su item_id
+    (coincidencia exacta si la hay; si no, el primer resultado).
+    """
+    def resolver():
+        url = f"{GRAPH}/drives/{drive_id}/root/search(q='{file_name}')"
+        try:
+            items = _get_json(url, get_token(config)).get("value", [])
+        except ErrorSharePoint as e:
+            raise ErrorSharePoint(f"Error al buscar el archivo: {e}") from None
+
+        if not items:
+            raise ErrorSharePoint(
+                f"No se ha encontrado ningún archivo llamado '{file_name}' en el sitio."
+            )
+        for item in items:
+            if item.get("name") == file_name:
+                return item.get("id")
+        return items[0].get("id")
+
+    return _memorizar(("item", drive_id, file_name), resolver)
+
+
+def olvidar_ids():
+    """Descarta los IDs memorizados (p. ej. si el archivo se ha movido)."""
+    with _lock:
+        _ids.clear()
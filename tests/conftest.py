@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+@pytest.fixture
+def estado_temporal(tmp_path, monkeypatch):
+    """Base de datos de títulos emitidos vacía para cada test."""
+    from hojas.utils import estado_utils
+
+    ruta = str(tmp_path / "estado.sqlite3")
+    monkeypatch.setattr(estado_utils, "RUTA_ESTADO", ruta)
+    return ruta
@@ -0,0 +1,26 @@
+import pandas as pd
+
+
+def alumnos_prueba(n: int = 3) -> pd.DataFrame:
+    """Filas de una hoja del registro con todas las columnas requeridas."""
+    return pd.DataFrame([
+        {
+            "NOMBRE": f"ALUMNO {i}",
+            "APELLIDOS": "PRUEBA",
+            "DNI ALUMNO": f"0000000{i}A",
+            "Nº TITULO": 100 + i,
+            "FECHA": "07/05/2024",
+            "FECHA EXPEDICIÓN": "07/06/2024",
+            "NOMBRE CURSO EXACTO EN TITULO": "CURSO",
+            "PROMOCION EN LA QUE FINALIZA": "1",
+        }
+        for i in range(n)
+    ])
+
+
+def registro_prueba(ruta, hoja: str = "BIM", n: int = 3) -> str:
+    """Excel con la hoja `hoja` en el formato del registro (cabecera en la tercera fila)."""
+    df = alumnos_prueba(n)
+    with pd.ExcelWriter(ruta) as writer:
+        df.to_excel(writer, sheet_name=hoja, startrow=2, index=False)
+    return str(ruta)
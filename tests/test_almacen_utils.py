@@ -0,0 +1,34 @@
+import os
+import shutil
+import zipfile
+from hojas.registro import ruta_plantilla
+from hojas.utils.almacen_utils import asegurar_plantilla, construir_almacen
+
+
+def _miembros(ruta: str) -> dict:
+    with zipfile.ZipFile(ruta) as zf:
+        return {nombre: zf.read(nombre) for nombre in zf.namelist()}
+
+
+def test_reconstruye_la_plantilla_que_falta_o_esta_desfasada(tmp_path):
+    plantillas, almacen = str(tmp_path / "plantillas"), str(tmp_path / "almacen")
+    os.makedirs(plantillas)
+    original = shutil.copy(ruta_plantilla("TITULO_BIM.docx"), plantillas)
+    construir_almacen(plantillas, almacen)
+    esperado = _miembros(original)
+
+    os.remove(original)
+    assert asegurar_plantilla("TITULO_BIM.docx", plantillas, almacen) == original
+    assert _miembros(original) == esperado
+
+    # Manifiesto más nuevo (git pull): se reconstruye; .docx más nuevo (recién editado): se respeta
+    manifiesto = os.path.join(almacen, "plantillas", "TITULO_BIM.docx.json")
+    os.utime(original, (0, 0))
+    asegurar_plantilla("TITULO_BIM.docx", plantillas, almacen)
+    assert os.path.getmtime(original) >= os.path.getmtime(manifiesto)
+
+    os.utime(manifiesto, (0, 0))
+    with open(original, "ab") as f:
+        f.write(b"editada")
+    asegurar_plantilla("TITULO_BIM.docx", plantillas, almacen)
+    assert open(original, "rb").read().endswith(b"editada")
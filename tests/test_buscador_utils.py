@@ -0,0 +1,42 @@
+import pandas as pd
+from datos_prueba import alumnos_prueba
+from hojas.utils import excel_utils
+from hojas.utils.buscador_utils import buscar_alumnos, sincronizar_indice
+
+
+def test_busca_numero_de_titulo_sin_decimales_y_sin_llenar_la_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(excel_utils, "DIRECTORIO_SNAPSHOTS", str(tmp_path / "snapshots"))
+    # Una fila sin Nº TITULO hace que pandas lea la columna como float (101.0)
+    df = pd.concat([alumnos_prueba(2), alumnos_prueba(1).assign(**{"Nº TITULO": None})])
+    ruta_excel = str(tmp_path / "registro.xlsx")
+    with pd.ExcelWriter(ruta_excel) as writer:
+        df.to_excel(writer, sheet_name="BIM", startrow=2, index=False)
+
+    hojas_en_cache = excel_utils.estadisticas_cache_hojas()["hojas"]
+    ruta_indice = str(tmp_path / "indice.sqlite3")
+    assert sincronizar_indice(ruta_excel, ruta_indice)
+
+    assert excel_utils.estadisticas_cache_hojas()["hojas"] == hojas_en_cache
+    for consulta in ("101", "101.0"):
+        resultados = buscar_alumnos(consulta, ruta=ruta_indice)
+        assert [r["n_titulo"] for r in resultados] == ["101"]
+
+
+def test_indice_en_segundo_plano_con_la_fila_de_cada_alumno(tmp_path, monkeypatch):
+    from hojas.utils.buscador_utils import alumnos_de_hoja, preparar_indice
+    from hojas.utils.excel_utils import leer_fila
+
+    monkeypatch.setattr(excel_utils, "DIRECTORIO_SNAPSHOTS", str(tmp_path / "snapshots"))
+    df = pd.concat([alumnos_prueba(1).assign(**{"Nº TITULO": None}), alumnos_prueba(3).iloc[1:]])
+    ruta_excel = str(tmp_path / "registro.xlsx")
+    with pd.ExcelWriter(ruta_excel) as writer:
+        df.to_excel(writer, sheet_name="BIM", startrow=2, index=False)
+    ruta_indice = str(tmp_path / "indice.sqlite3")
+
+    assert alumnos_de_hoja(ruta_excel, "BIM", ruta=ruta_indice) is None
+    preparar_indice(ruta_excel, ruta=ruta_indice).join()
+    assert preparar_indice(ruta_excel, ruta=ruta_indice) is None
+
+    alumnos = alumnos_de_hoja(ruta_excel, "BIM", ruta=ruta_indice)
+    assert [(a["nombre_completo"], a["fila"]) for a in alumnos] == [("ALUMNO 1 PRUEBA", 1), ("ALUMNO 2 PRUEBA", 2)]
+    assert leer_fila(ruta_excel, "BIM", alumnos[1]["fila"])["DNI ALUMNO"] == "00000002A"
@@ -0,0 +1,81 @@
+import os
+import socket
+import sys
+import textwrap
+import pytest
+from hojas.utils import conversion_utils
+from hojas.utils.conversion_utils import ConversorPDF, _Worker
+
+SERVIDOR_LENTO = """
+    import socket, sys, time
+    puerto = int(sys.argv[sys.argv.index("--port") + 1])
+    time.sleep({retraso})
+    servidor = socket.create_server(("127.0.0.1", puerto))
+    time.sleep(60)
+"""
+
+
+@pytest.fixture
+def unoserver_falso(tmp_path, monkeypatch):
+    """Pone en el PATH un unoserver/unoconvert de prueba con el código dado."""
+    def instalar(codigo: str):
+        for nombre, contenido in (("unoserver", codigo), ("unoconvert", "")):
+            ruta = tmp_path / nombre
+            ruta.write_text(f"#!{sys.executable}\n" + textwrap.dedent(contenido))
+            ruta.chmod(0o755)
+        monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+    return instalar
+
+
+def _worker() -> _Worker:
+    return _Worker(None, 0)
+
+
+def test_espera_a_que_unoserver_escuche(unoserver_falso):
+    unoserver_falso(SERVIDOR_LENTO.format(retraso=0.5))
+    worker = _worker()
+    worker._arrancar_servidor()
+    try:
+        assert worker.servidor is not None
+        socket.create_connection(("127.0.0.1", worker.puerto), timeout=1).close()
+    finally:
+        if worker.servidor is not None:
+            worker.servidor.kill()
+
+
+def test_sin_unoserver_escuchando_se_usa_soffice(unoserver_falso, monkeypatch):
+    monkeypatch.setattr(conversion_utils, "TIEMPO_ARRANQUE_S", 1)
+    unoserver_falso(SERVIDOR_LENTO.format(retraso=30))
+    worker = _worker()
+    worker._arrancar_servidor()
+    assert worker.servidor is None
+
+
+def test_si_unoserver_no_arranca_los_trabajos_fallan_sin_colgarse(unoserver_falso, tmp_path, monkeypatch):
+    unoserver_falso("")
+    # Intérprete inexistente: Popen lanza OSError al arrancar el servidor
+    (tmp_path / "unoserver").write_text("#!/no/existe\n")
+    conversor = ConversorPDF(workers=1)
+    try:
+        futuro = conversor.convertir(str(tmp_path / "titulo.docx"))
+        with pytest.raises(Exception):
+            futuro.result(timeout=30)
+    finally:
+        conversor.cerrar()
+
+
+def test_si_un_worker_muere_fallan_los_trabajos_en_cola(unoserver_falso, tmp_path, monkeypatch):
+    def atender_y_romper(self):
+        trabajo = self.conversor.cola.get()
+        self.conversor.cola.put(trabajo)
+        raise RuntimeError("worker roto")
+
+    unoserver_falso("")
+    monkeypatch.setattr(_Worker, "_arrancar_servidor", lambda self: None)
+    monkeypatch.setattr(_Worker, "_atender_cola", atender_y_romper)
+    conversor = ConversorPDF(workers=1)
+
+    futuro = conversor.convertir(str(tmp_path / "titulo.docx"))
+    with pytest.raises(RuntimeError, match="worker roto"):
+        futuro.result(timeout=30)
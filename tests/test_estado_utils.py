@@ -0,0 +1,63 @@
+import sqlite3
+from datos_prueba import alumnos_prueba
+from hojas.utils.estado_utils import EMITIDO, MODIFICADO, NUEVO, estado_filas, marcar_emitidos
+
+
+def test_mismo_numero_en_otra_hoja_no_se_pisa(estado_temporal):
+    df = alumnos_prueba(1)
+    otro = df.assign(NOMBRE="OTRA PERSONA")
+
+    marcar_emitidos(df.to_dict("records"), "BIM", "TITULO_BIM.docx")
+    marcar_emitidos(otro.to_dict("records"), "SAP", "TITULO_SAP.docx")
+
+    assert estado_filas(df, "BIM").tolist() == [EMITIDO]
+    assert estado_filas(otro, "SAP").tolist() == [EMITIDO]
+    assert estado_filas(df, "SAP").tolist() == [MODIFICADO]
+    assert estado_filas(df, "CIBER").tolist() == [NUEVO]
+
+
+def test_migra_la_base_antigua_sin_hoja(estado_temporal):
+    from hojas.utils.estado_utils import huella_alumno
+
+    alumno = alumnos_prueba(1).to_dict("records")[0]
+    conexion = sqlite3.connect(estado_temporal)
+    conexion.execute(
+        "CREATE TABLE emitidos (n_titulo TEXT PRIMARY KEY, huella TEXT NOT NULL, "
+        "dni TEXT, plantilla TEXT, emitido TEXT NOT NULL)"
+    )
+    conexion.execute(
+        "INSERT INTO emitidos VALUES (?, ?, ?, ?, ?)",
+        ("100", huella_alumno(alumno), "00000000A", "TITULO_BIM.docx", "2024-06-07T00:00:00"),
+    )
+    conexion.commit()
+    conexion.close()
+
+    assert estado_filas(alumnos_prueba(1), "BIM").tolist() == [EMITIDO]
+
+
+def test_numero_de_titulo_leido_como_float_sigue_emitido(estado_temporal):
+    df = alumnos_prueba(1)
+    marcar_emitidos(df.to_dict("records"), "BIM", "TITULO_BIM.docx")
+
+    # Con alguna fila sin Nº TITULO pandas lee la columna como float
+    como_float = df.astype({"Nº TITULO": float})
+    assert estado_filas(como_float, "BIM").tolist() == [EMITIDO]
+
+
+def test_normaliza_los_numeros_guardados_con_decimales(estado_temporal):
+    from hojas.utils.estado_utils import huella_alumno
+
+    alumno = alumnos_prueba(1).to_dict("records")[0]
+    conexion = sqlite3.connect(estado_temporal)
+    conexion.execute(
+        "CREATE TABLE emitidos (hoja TEXT NOT NULL, n_titulo TEXT NOT NULL, huella TEXT NOT NULL, "
+        "dni TEXT, plantilla TEXT, emitido TEXT NOT NULL, PRIMARY KEY (hoja, n_titulo))"
+    )
+    conexion.execute(
+        "INSERT INTO emitidos VALUES (?, ?, ?, ?, ?, ?)",
+        ("BIM", "100.0", huella_alumno(alumno), "00000000A", "TITULO_BIM.docx", "2024-06-07T00:00:00"),
+    )
+    conexion.commit()
+    conexion.close()
+
+    assert estado_filas(alumnos_prueba(1), "BIM").tolist() == [EMITIDO]
@@ -0,0 +1,36 @@
+from streamlit.testing.v1 import AppTest
+from datos_prueba import registro_prueba
+from hojas import expedicion
+from hojas.utils import buscador_utils, excel_utils
+
+
+def _pagina_expedicion():
+    import os
+    from hojas import expedicion
+
+    expedicion.run(os.environ["REGISTRO_PRUEBA"], "BIM")
+
+
+def test_el_selector_sale_del_indice_sin_cargar_la_hoja(tmp_path, monkeypatch, estado_temporal):
+    monkeypatch.setattr(excel_utils, "DIRECTORIO_SNAPSHOTS", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(buscador_utils, "RUTA_INDICE", str(tmp_path / "indice.sqlite3"))
+    ruta = registro_prueba(tmp_path / "registro.xlsx")
+    monkeypatch.setenv("REGISTRO_PRUEBA", ruta)
+    buscador_utils.sincronizar_indice(ruta)
+    vistas, hojas_en_cache = len(expedicion._vistas), excel_utils.estadisticas_cache_hojas()["hojas"]
+
+    at = AppTest.from_function(_pagina_expedicion, default_timeout=120)
+    at.run()
+    at.selectbox(key="alumno_BIM").set_value("ALUMNO 2 PRUEBA").run()
+    at.button[0].click().run()
+
+    assert not at.exception
+    assert [e.value for e in at.error] == []
+    assert at.selectbox(key="alumno_BIM").options == ["ALUMNO 0 PRUEBA", "ALUMNO 1 PRUEBA", "ALUMNO 2 PRUEBA"]
+    assert at.get("download_button")[0].proto.label == "📥 Descargar DOCX"
+    assert len(expedicion._vistas) == vistas
+    assert excel_utils.estadisticas_cache_hojas()["hojas"] == hojas_en_cache
+
+    at.toggle(key="lotes_BIM").set_value(True).run()
+    assert not at.exception
+    assert at.number_input(key="lote_workers_BIM_NORMAL") is not None
@@ -0,0 +1,21 @@
+import datetime
+import pandas as pd
+from hojas.utils.excel_utils import _normalizar_tipos
+from hojas.utils.fecha_utils import formatear_fecha, normalizar_fechas, parsear_fechas
+
+
+def test_serie_de_excel_en_columna_mixta_da_la_misma_fecha():
+    df = _normalizar_tipos(pd.DataFrame({"FECHA": [45000, "07/05/2024", datetime.datetime(2024, 5, 8)]}))
+
+    informe = normalizar_fechas(df)
+
+    assert informe.empty
+    assert df["FECHA_TXT"].tolist() == ["15/03/2023", "07/05/2024", "08/05/2024"]
+    assert formatear_fecha(45000) == formatear_fecha("45000") == "15/03/2023"
+
+
+def test_texto_numerico_fuera_de_rango_no_es_fecha():
+    fechas = parsear_fechas(pd.Series(["12", "45000.5", "texto"], dtype=object))
+
+    assert fechas.isna().tolist() == [True, False, True]
+    assert formatear_fecha("12") == ""
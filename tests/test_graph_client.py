@@ -0,0 +1,22 @@
+import pytest
+import requests
+import graph_client
+
+
+def _respuesta(retry_after: str) -> requests.Response:
+    respuesta = requests.Response()
+    respuesta.status_code = 429
+    respuesta.headers["Retry-After"] = retry_after
+    return respuesta
+
+
+@pytest.mark.parametrize("retry_after", ["1.5", "pronto"])
+def test_retry_after_no_valido_usa_el_backoff(retry_after):
+    espera = graph_client._espera(2, _respuesta(retry_after))
+
+    base = graph_client.BACKOFF_BASE_S * 2 ** 2
+    assert base * 0.8 <= espera <= min(base, graph_client.BACKOFF_MAX_S) * 1.2
+
+
+def test_retry_after_en_segundos():
+    assert graph_client._espera(0, _respuesta("3")) == min(3, graph_client.BACKOFF_MAX_S)
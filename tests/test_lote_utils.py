@@ -0,0 +1,92 @@
+import zipfile
+from streamlit.testing.v1 import AppTest
+from datos_prueba import alumnos_prueba, registro_prueba
+from hojas.registro import ruta_plantilla
+from hojas.utils.estado_utils import NUEVO, estado_filas
+from hojas.utils.lote_utils import MANIFIESTO_LOTE, generar_zip_desde_excel
+
+
+def _pagina_lote():
+    from datos_prueba import alumnos_prueba
+    from hojas.registro import ruta_plantilla
+    from hojas.utils.lote_utils import mostrar_generacion_lote
+
+    mostrar_generacion_lote(alumnos_prueba(), ruta_plantilla("TITULO_BIM.docx"), "NORMAL", "BIM")
+
+
+def _generar_lote():
+    at = AppTest.from_function(_pagina_lote, default_timeout=120)
+    at.run()
+    at.number_input(key="lote_workers_BIM_NORMAL").set_value(1)
+    at.button(key="lote_generar_BIM_NORMAL").click().run()
+    return at
+
+
+def test_generar_lote_ofrece_la_descarga(estado_temporal):
+    at = _generar_lote()
+
+    assert not at.exception
+    assert [e.value for e in at.error] == []
+    assert len(at.get("download_button")) == 1
+
+
+def test_generar_lote_no_marca_emitidos_hasta_descargar(estado_temporal):
+    _generar_lote()
+
+    assert (estado_filas(alumnos_prueba(), "BIM") == NUEVO).all()
+
+
+def _pagina_dos_hojas():
+    from datos_prueba import alumnos_prueba
+    from hojas.registro import ruta_plantilla
+    from hojas.utils.lote_utils import mostrar_generacion_lote
+
+    mostrar_generacion_lote(alumnos_prueba(), ruta_plantilla("TITULO_BIM.docx"), "NORMAL", "BIM")
+    mostrar_generacion_lote(alumnos_prueba(), ruta_plantilla("TITULO_SAP.docx"), "NORMAL", "SAP")
+
+
+def test_los_filtros_del_lote_son_propios_de_cada_hoja():
+    at = AppTest.from_function(_pagina_dos_hojas, default_timeout=120)
+    at.run()
+    at.checkbox(key="lote_usar_titulos_BIM_NORMAL").check().run()
+
+    assert not at.exception
+    assert at.checkbox(key="lote_usar_titulos_BIM_NORMAL").value
+    assert not at.checkbox(key="lote_usar_titulos_SAP_NORMAL").value
+
+
+def test_lote_desde_excel_con_total_desconocido(tmp_path):
+    ruta = registro_prueba(tmp_path / "registro.xlsx")
+    avances = []
+
+    with generar_zip_desde_excel(
+        ruta, "BIM", ruta_plantilla("TITULO_BIM.docx"), "NORMAL",
+        titulos={"100", "102"}, progreso=lambda hechos, total: avances.append((hechos, total)),
+    ) as archivo:
+        nombres = zipfile.ZipFile(archivo).namelist()
+
+    assert sorted(nombres) == [MANIFIESTO_LOTE, "TITULO_NORMAL_00000000A.docx", "TITULO_NORMAL_00000002A.docx"]
+    assert avances == [(1, None), (2, None)]
+
+
+def test_streaming_y_hoja_cargada_rellenan_igual(tmp_path, monkeypatch):
+    import pandas as pd
+    from hojas.expedicion import obtener_vista
+    from hojas.utils import excel_utils
+    from hojas.utils.estado_utils import huella_alumno
+    from hojas.utils.excel_utils import iterar_alumnos
+    from hojas.utils.plantilla_utils import construir_campos
+
+    monkeypatch.setattr(excel_utils, "DIRECTORIO_SNAPSHOTS", str(tmp_path / "snapshots"))
+    # Una fila sin Nº TITULO: pandas lee la columna como float, openpyxl como int
+    df = pd.concat([alumnos_prueba(2), alumnos_prueba(1).assign(**{"Nº TITULO": None, "DNI ALUMNO": "X"})])
+    ruta = str(tmp_path / "registro.xlsx")
+    with pd.ExcelWriter(ruta) as writer:
+        df.to_excel(writer, sheet_name="BIM", startrow=2, index=False)
+
+    cargados = obtener_vista(ruta, "BIM")["df"].to_dict("records")
+    leidos = list(iterar_alumnos(ruta, "BIM"))
+
+    assert [construir_campos(a) for a in leidos] == [construir_campos(a) for a in cargados]
+    assert [huella_alumno(a) for a in leidos] == [huella_alumno(a) for a in cargados]
+    assert construir_campos(leidos[0])["{{NºTITULO}}"] == "100"
@@ -0,0 +1,33 @@
+import zipfile
+import pytest
+from hojas.utils.motor_zip_utils import PlantillaZip
+from hojas.utils.plantilla_utils import renderizar_documento
+
+# {{NOMBRE}} entero en el primer párrafo y partido en dos runs en el segundo
+DOCUMENTO = (
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+    "<w:p><w:r><w:t>{{NOMBRE}}</w:t></w:r></w:p>"
+    "<w:p><w:r><w:t>Alumno: {{NOM</w:t></w:r><w:r><w:t>BRE}}</w:t></w:r>"
+    "<w:r><w:t>{{DNI}}</w:t></w:r></w:p>"
+    "</w:body></w:document>"
+)
+
+
+@pytest.fixture
+def plantilla(tmp_path):
+    ruta = tmp_path / "TITULO_PRUEBA.docx"
+    with zipfile.ZipFile(ruta, "w") as zf:
+        zf.writestr("word/document.xml", DOCUMENTO)
+    return str(ruta)
+
+
+def test_detecta_marcador_partido_aunque_aparezca_entero_en_otro_parrafo(plantilla):
+    plantilla_zip = PlantillaZip(plantilla)
+    assert plantilla_zip.marcadores_partidos == {"{{NOMBRE}}"}
+    assert not plantilla_zip.admite({"{{NOMBRE}}": "ANA"})
+    assert plantilla_zip.admite({"{{DNI}}": "00000000A"})
+
+
+def test_motor_zip_forzado_no_rellena_a_medias(plantilla):
+    with pytest.raises(ValueError, match="NOMBRE"):
+        renderizar_documento({"{{NOMBRE}}": "ANA", "{{DNI}}": "00000000A"}, plantilla, motor="zip")
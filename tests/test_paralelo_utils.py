@@ -0,0 +1,29 @@
+import sys
+import types
+from datos_prueba import alumnos_prueba
+from hojas.registro import ruta_plantilla
+from hojas.utils.paralelo_utils import generar_documentos_en_paralelo
+
+
+def test_genera_en_varios_procesos(monkeypatch):
+    # Los procesos "spawn" vuelven a importar __main__; tras los tests con
+    # AppTest es un script generado que no se puede importar fuera de Streamlit
+    monkeypatch.setitem(sys.modules, "__main__", types.ModuleType("__main__"))
+    alumnos = alumnos_prueba(3).to_dict("records")
+
+    documentos = generar_documentos_en_paralelo(
+        alumnos, ruta_plantilla("TITULO_BIM.docx"), "NORMAL", workers=2, tamano_bloque=1
+    )
+
+    nombres = sorted(nombre for nombre, _ in documentos)
+    assert nombres == [f"TITULO_NORMAL_0000000{i}A.docx" for i in range(3)]
+
+
+def test_con_motor_auto_solo_se_precarga_el_motor_zip():
+    from hojas.utils.paralelo_utils import _iniciar_worker
+    from hojas.utils.plantilla_utils import estadisticas_cache_plantillas
+
+    antes = estadisticas_cache_plantillas()
+    _iniciar_worker(ruta_plantilla("TITULO_BIM.docx"), "auto")
+
+    assert estadisticas_cache_plantillas() == antes
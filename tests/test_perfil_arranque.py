@@ -0,0 +1,31 @@
+import importlib.util
+import os
+from conftest import RAIZ
+
+_spec = importlib.util.spec_from_file_location(
+    "perfil_arranque", os.path.join(RAIZ, "benchmarks", "perfil_arranque.py")
+)
+perfil_arranque = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(perfil_arranque)
+
+# Salida de -X importtime: los hijos aparecen antes que su padre
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |     _codecs
+import time:       200 |        300 |   codecs
+import time:       300 |        600 | encodings
+import time:        50 |         50 |   _json
+import time:       100 |        150 | json
+import time:      1000 |       1000 |     altair
+import time:      2000 |       3000 |   streamlit
+import time:       400 |        400 |   hojas.registro
+import time:       500 |       3900 | app
+import time:       700 |        700 | docx
+"""
+
+
+def test_solo_recoge_los_imports_directos_de_app():
+    assert perfil_arranque._modulos_de_app(IMPORTTIME) == [
+        ("streamlit", 2.0, 3.0),
+        ("hojas.registro", 0.4, 0.4),
+    ]